@@ -1,8 +1,13 @@
 # -*- coding: utf-8 -*-
 import os
 import re
+import bisect
+import functools
+import mmap
+from concurrent.futures import ProcessPoolExecutor
 import logging
 from collections import defaultdict
+from itertools import product
 import shutil # For potential backup functionality
 
 # 配置日志记录器 (中文)
@@ -14,43 +19,125 @@ logging.addLevelName(logging.DEBUG, "调试")
 
 # --- 常量 ---
 PREFIX = "ced_todo_" # 定义要添加的前缀
+MMAP_MIN_FILE_SIZE = 1024 * 1024 # 不小于此大小 (字节) 的文件用 mmap 做预过滤
+# ".xml" 的全部大小写组合，str.endswith(tuple) 无需为每个文件名生成小写副本
+XML_SUFFIXES = tuple('.' + ''.join(chars) for chars in product(*zip('xml', 'XML')))
+# 表名后紧跟这些关键字时不是别名
+ALIAS_STOPWORDS = frozenset(['WHERE', 'SET', 'VALUES', 'ON', 'AND', 'OR', 'AS', 'ORDER', 'GROUP', 'BY', 'LEFT', 'RIGHT', 'INNER', 'OUTER', 'JOIN'])
 
 # --- 正则表达式创建函数 ---
+# 模板中的表名/列名占位符均需传入 re.escape 之后的字符串 (在 compile_target_patterns 中统一转义一次)
+
+# 查找表别名，{index} 为表序号，使所有表的检测可合并为一个正则 (命中的分组名即表序号)
+ALIAS_DETECTION_TEMPLATE = r'(?:FROM|JOIN|UPDATE)\s+{table}\s+(?:AS\s+)?(?P<alias_{index}>\b\w+\b)|[,\s]{table}\s+(?:AS\s+)?(?P<alias_alt_{index}>\b\w+\b)'
+# 直接的 table.column 用法，(?<!...) 是负向后行断言，确保前面不是前缀
+DIRECT_USAGE_TEMPLATE = r'(?<!{prefix})(?<!\w){table}\.{column}(?!\w)'
+# alias.column 用法: {aliases} 为该文件检测到的全部别名，替换回调再判断匹配处是否为当前生效的别名
+ALIAS_USAGE_TEMPLATE = r'(?<!\w)(?:{aliases})\.(?:{columns})(?!\w)'
+# resultMap/result 的 column="column" 用法
+# 所有列合并为一个分组 rmap_col，替换时在 rmap_col 的起始位置插入前缀
+RESULTMAP_COLUMN_TEMPLATE = r'\bcolumn\s*=\s*["\'](?<!{prefix})(?P<rmap_col>{columns})(?=["\'])'
+
+ESCAPED_PREFIX = re.escape(PREFIX)
+
+def create_alias_pattern(escaped_tables):
+    """将所有表的别名检测合并为一个交替正则，每个文件只需一次 finditer。"""
+    return re.compile(
+        "|".join(ALIAS_DETECTION_TEMPLATE.format(table=escaped, index=i) for i, escaped in enumerate(escaped_tables)),
+        re.IGNORECASE,
+    )
+
+def create_replace_sources(table_column_map, escaped_names):
+    """
+    生成合并替换正则中与文件无关的部分: direct 分支 (每个 表.列 一个命名分组) 和 resultMap 分支。
+    alias 分支依赖各文件检测到的别名，由 compile_replace_pattern 按文件补上。
 
-# 查找表别名 (保持不变)
-def create_alias_pattern(table_name):
-    pattern = r'(?:FROM|JOIN|UPDATE)\s+' + re.escape(table_name) + r'\s+(?:AS\s+)?(\b\w+\b)'
-    pattern_alt = r'([,\s])' + re.escape(table_name) + r'\s+(?:AS\s+)?(\b\w+\b)'
-    combined_pattern = f"({pattern})|({pattern_alt})"
-    return re.compile(combined_pattern, re.IGNORECASE)
-
-# 查找并替换直接的 table.column 用法
-# 修改: 添加捕获组以便于替换，并确保不匹配已加前缀的
-def create_direct_usage_pattern_for_replace(table_name, column_name):
-    # (?<!...) 是负向先行断言，确保前面不是前缀
-    # 分组捕获表名和列名
-    pattern = r'(?<!' + PREFIX + r')(?<!\w)(' + re.escape(table_name) + r')\.(' + re.escape(column_name) + r')(?!\w)'
-    return re.compile(pattern, re.IGNORECASE)
-
-# 查找并替换 alias.column 用法
-# 修改: 添加捕获组以便于替换，确保不匹配已加前缀的列名
-def create_alias_usage_pattern_for_replace(alias, column_name):
-     # 分组捕获别名和列名
-    pattern = r'(?<!\w)(' + re.escape(alias) + r')\.(' + re.escape(column_name) + r')(?!\w)(?!' + PREFIX + r')' # 确保列名后不是前缀 (防止部分匹配如 alias.ced_todo_col) - 可能不需要，因为列名检查更精确
-    # 更简单的版本：仅检查列名前没有前缀
-    pattern = r'(?<!\w)(' + re.escape(alias) + r')\.(?<!' + PREFIX + r')(' + re.escape(column_name) + r')(?!\w)'
-    return re.compile(pattern, re.IGNORECASE)
-
-# 查找并替换 resultMap/result 的 column="column" 用法
-# 修改: 添加捕获组以便于替换，确保不匹配已加前缀的
-def create_resultmap_column_pattern_for_replace(column_name):
-    # 分组捕获 'column="' 部分, 列名, 和结尾引号 '"'
-    # (?<!...) 确保列名前面不是前缀
-    pattern = r'(\bcolumn\s*=\s*["\'])(?<!' + PREFIX + r')(' + re.escape(column_name) + r')(["\'])'
-    return re.compile(pattern, re.IGNORECASE)
+    Args:
+        table_column_map (dict): {表名: [列名列表]}。
+        escaped_names (dict): {原始表名/列名: re.escape 后的字符串}。
+
+    Returns:
+        tuple: ((direct 源码, rmap 源码, 转义后的列名交替), direct 分组对应的 (表名, 列名) 列表, 去重后的全部目标列名)
+    """
+    direct_targets = [(table, col) for table, columns in table_column_map.items() for col in columns]
+    target_columns = list(dict.fromkeys(col for columns in table_column_map.values() for col in columns))
+    escaped_columns = '|'.join(escaped_names[c] for c in target_columns)
+
+    direct_source = "|".join(
+        f"(?P<direct_{i}>"
+        + DIRECT_USAGE_TEMPLATE.format(prefix=ESCAPED_PREFIX, table=escaped_names[table], column=escaped_names[col])
+        + ")"
+        for i, (table, col) in enumerate(direct_targets)
+    )
+    rmap_source = "(?P<rmap>" + RESULTMAP_COLUMN_TEMPLATE.format(prefix=ESCAPED_PREFIX, columns=escaped_columns) + ")"
+    return (direct_source, rmap_source, escaped_columns), direct_targets, target_columns
+
+@functools.lru_cache(maxsize=256)
+def compile_replace_pattern(replace_sources, aliases):
+    """
+    将 direct / alias / resultMap 替换合并为一个带命名分组的交替正则，使每个文件只需一次 C 层扫描。
+    alias 分支只包含该文件中检测到的别名 (小写、有序的元组，为空时省略该分支)；
+    同一项目的文件大多使用相同的别名组合，lru_cache 使每种组合只编译一次。
+    """
+    direct_source, rmap_source, escaped_columns = replace_sources
+    alternatives = [direct_source]
+    if aliases:
+        alternatives.append(
+            "(?P<alias>"
+            + ALIAS_USAGE_TEMPLATE.format(aliases='|'.join(re.escape(a) for a in aliases), columns=escaped_columns)
+            + ")"
+        )
+    alternatives.append(rmap_source)
+    return re.compile("|".join(alternatives), re.IGNORECASE)
+
+def compile_target_patterns(table_column_map):
+    """
+    根据目标表/列一次性编译全部模式，在 main() 中调用一次，供所有文件复用。
+
+    Returns:
+        dict: 传给 process_and_modify_file 的模式集合。
+    """
+    escaped_names = {table: re.escape(table) for table in table_column_map}
+    escaped_names.update((col, re.escape(col)) for columns in table_column_map.values() for col in columns)
+
+    replace_sources, direct_targets, target_columns = create_replace_sources(table_column_map, escaped_names)
+    prefilter_tokens = minimize_prefilter_tokens(c.lower().encode('utf-8') for c in target_columns)
+    return {
+        'replace_sources': replace_sources,
+        'direct_targets': direct_targets,
+        'alias_detection': create_alias_pattern(escaped_names[table] for table in table_column_map),
+        'alias_tables': list(table_column_map),
+        'columns_lower': {table: {c.lower() for c in columns} for table, columns in table_column_map.items()},
+        # 任何一种替换都要求列名出现在文件中，用于快速跳过无关文件
+        'prefilter_tokens': prefilter_tokens,
+        # 大文件 (mmap) 使用的等价预过滤，bytes 模式下 IGNORECASE 与 bytes.lower() 一致 (仅 ASCII)
+        'prefilter_regex': re.compile(b'|'.join(re.escape(t) for t in prefilter_tokens), re.IGNORECASE),
+    }
+
+def minimize_prefilter_tokens(tokens):
+    """
+    去重并去掉包含其他 token 的 token: 长 token 出现时短 token 必然也出现，
+    只检查短的即可得到相同的过滤结果。短的排在前面，命中时 any() 可尽早返回。
+    """
+    kept = []
+    for token in sorted(set(tokens), key=len):
+        if not any(shorter in token for shorter in kept):
+            kept.append(token)
+    return tuple(kept)
 
 # --- 核心处理函数 ---
 
+def write_file_bytes(file_path, payload):
+    """以二进制方式整体写回文件 (不做换行符转换，保留原文件的 CRLF/LF)。"""
+    fd = os.open(file_path, os.O_WRONLY | os.O_TRUNC | getattr(os, 'O_BINARY', 0))
+    try:
+        view = memoryview(payload)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+    finally:
+        os.close(fd)
+
 def parse_target_columns(column_specs):
     """解析 '表名.列名' 列表为字典 (保持不变)"""
     table_column_map = defaultdict(list)
@@ -71,105 +158,105 @@ def parse_target_columns(column_specs):
     return dict(table_column_map)
 
 
-def process_and_modify_file(file_path, table_column_map, modified_lines_report):
+def process_and_modify_file(file_path, patterns, modified_lines_report):
     """
     读取文件，查找、替换目标字段，并记录修改位置。
     如果发生修改，则写回文件。
 
     Args:
         file_path (str): XML 文件路径。
-        table_column_map (dict): {表名: [列名列表]}。
-        modified_lines_report (set): 用于收集 "filepath:linenum" 字符串的集合。
+        patterns (dict): compile_target_patterns() 返回的预编译模式。
+        modified_lines_report (set): 用于收集 (文件路径, 行号) 元组的集合。
 
     Returns:
         bool: 如果文件被修改则返回 True，否则 False。
     """
+    # --- 读取 + 预过滤: 文件中不含任何目标列名时，跳过解码和全部正则扫描 ---
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size >= MMAP_MIN_FILE_SIZE:
+                # 大文件: 直接在 mmap 上预过滤，未命中时既不读入内存也不生成小写副本
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if not patterns['prefilter_regex'].search(mm):
+                        return False
+                    raw = mm[:]
+            else:
+                raw = f.read()
+                raw_lower = raw.lower()
+                if not any(token in raw_lower for token in patterns['prefilter_tokens']):
+                    return False
     except Exception as e:
         logging.error(f"无法读取文件 {file_path}: {e}")
         return False
 
-    new_lines = []
-    file_modified = False
-    current_aliases = {} # 当前文件内，每个目标表的最新别名
-
-    # --- 预编译所有替换模式 ---
-    replace_patterns = defaultdict(list)
-    alias_detection_patterns = {table: create_alias_pattern(table) for table in table_column_map}
-
-    for table, columns in table_column_map.items():
-        for col in columns:
-            # 直接使用: (pattern, replacement_template)
-            replace_patterns[(table, col, 'direct')] = (
-                create_direct_usage_pattern_for_replace(table, col),
-                rf'{PREFIX}\1.{PREFIX}\2' # \1=table, \2=column
-            )
-            # ResultMap/Result: (pattern, replacement_template)
-            replace_patterns[(col, 'resultmap')] = (
-                create_resultmap_column_pattern_for_replace(col),
-                rf'\1{PREFIX}\2\3' # \1=column=", \2=column, \3="
-            )
-
-    # --- 逐行处理 ---
-    for line_num, line in enumerate(lines, 1):
-        original_line = line
-        modified_line = line
-        line_was_modified = False
-
-        # 1. 检测别名 (需要在替换前进行，以获得正确的别名)
-        for table_name in table_column_map:
-            for match in alias_detection_patterns[table_name].finditer(original_line): # 使用原始行检测别名
-                alias = match.group(2) or match.group(4)
-                if alias and alias.upper() not in ['WHERE', 'SET', 'VALUES', 'ON', 'AND', 'OR', 'AS', 'ORDER', 'GROUP', 'BY', 'LEFT', 'RIGHT', 'INNER', 'OUTER', 'JOIN']:
-                    current_aliases[table_name] = alias
-                    #logging.debug(f"文件 {os.path.basename(file_path)} 行 {line_num}: 找到别名 '{alias}' for '{table_name}'")
-
-
-        # 2. 应用替换：直接使用 (table.column)
-        for (table, col, _type), (pattern, repl) in replace_patterns.items():
-            if _type == 'direct':
-                 modified_line, count = pattern.subn(repl, modified_line)
-                 if count > 0:
-                    logging.debug(f"文件 {os.path.basename(file_path)} 行 {line_num}: 替换直接引用 {table}.{col}")
-                    line_was_modified = True
-
-        # 3. 应用替换：别名使用 (alias.column)
-        # 需要为每个当前有效的别名动态创建模式
-        for table_name, alias in current_aliases.items():
-            if table_name in table_column_map:
-                 for column_name in table_column_map[table_name]:
-                    alias_pattern_repl = create_alias_usage_pattern_for_replace(alias, column_name)
-                    alias_repl = rf'\1.{PREFIX}\2' # \1=alias, \2=column
-                    modified_line, count = alias_pattern_repl.subn(alias_repl, modified_line)
-                    if count > 0:
-                        logging.debug(f"文件 {os.path.basename(file_path)} 行 {line_num}: 替换别名引用 {alias}.{column_name}")
-                        line_was_modified = True
-
-        # 4. 应用替换：ResultMap/Result (column="column")
-        # 检查所有需要检查的列
-        processed_resultmap_cols = set() # 防止同一行对同一列多次处理（虽然模式本身会防止）
-        for table, columns in table_column_map.items():
-            for col in columns:
-                 if col not in processed_resultmap_cols:
-                     pattern_key = (col, 'resultmap')
-                     if pattern_key in replace_patterns:
-                         pattern, repl = replace_patterns[pattern_key]
-                         modified_line, count = pattern.subn(repl, modified_line)
-                         if count > 0:
-                             logging.debug(f"文件 {os.path.basename(file_path)} 行 {line_num}: 替换ResultMap/Result column=\"{col}\"")
-                             line_was_modified = True
-                             processed_resultmap_cols.add(col)
-
-
-        # --- 记录和添加 ---
-        if line_was_modified:
-            report_key = f"{file_path}:{line_num}"
-            modified_lines_report.add(report_key)
-            file_modified = True
-
-        new_lines.append(modified_line) # 添加（可能）修改后的行
+    try:
+        data = raw.decode('utf-8')
+    except UnicodeDecodeError as e:
+        logging.error(f"无法读取文件 {file_path}: {e}")
+        return False
+
+    direct_targets = patterns['direct_targets']
+    alias_tables = patterns['alias_tables']
+    columns_lower = patterns['columns_lower']
+
+    # --- 行首偏移量，用于通过 bisect 将匹配位置换算为行号 ---
+    line_starts = [0]
+    pos = data.find('\n')
+    while pos != -1:
+        line_starts.append(pos + 1)
+        pos = data.find('\n', pos + 1)
+
+    # --- 1. 检测别名 (所有表合并为一次 finditer，在原始文本上进行) ---
+    # 检测到的别名从其所在行的行首起生效，直到被同表的新别名取代
+    alias_events = [] # [(别名所在行的行首偏移量, 表名, 别名)]，finditer 按位置产出，天然有序
+    for match in patterns['alias_detection'].finditer(data):
+        alias_group = match.lastgroup # alias_<i> 或 alias_alt_<i>
+        alias = match.group(alias_group)
+        if alias and alias.upper() not in ALIAS_STOPWORDS:
+            table_name = alias_tables[int(alias_group.rsplit('_', 1)[1])]
+            line_start = line_starts[bisect.bisect_right(line_starts, match.start(alias_group)) - 1]
+            alias_events.append((line_start, table_name, alias))
+
+    # --- 2. 单次扫描完成全部替换 ---
+    current_aliases = {} # 扫描位置处，每个目标表的最新别名
+    next_event = 0
+    replaced_count = 0
+
+    def replace_match(m):
+        nonlocal next_event, replaced_count
+        text = m.group()
+        kind = m.lastgroup
+        line_num = bisect.bisect_right(line_starts, m.start())
+
+        if kind == 'alias':
+            # 推进别名状态到当前位置 (sub 的回调按位置顺序调用)
+            while next_event < len(alias_events) and alias_events[next_event][0] <= m.start():
+                _, table_name, alias = alias_events[next_event]
+                current_aliases[table_name] = alias
+                next_event += 1
+            alias, _, column_name = text.partition('.')
+            if not any(alias.lower() == current.lower() and column_name.lower() in columns_lower[table_name]
+                       for table_name, current in current_aliases.items()):
+                return text
+            logging.debug(f"文件 {os.path.basename(file_path)} 行 {line_num}: 替换别名引用 {text}")
+            new_text = f"{alias}.{PREFIX}{column_name}"
+        elif kind.startswith('direct_'):
+            table, col = direct_targets[int(kind[len('direct_'):])]
+            logging.debug(f"文件 {os.path.basename(file_path)} 行 {line_num}: 替换直接引用 {table}.{col}")
+            new_text = f"{PREFIX}{text[:len(table)]}.{PREFIX}{text[len(table) + 1:]}"
+        else: # rmap
+            col_offset = m.start('rmap_col') - m.start()
+            logging.debug(f"文件 {os.path.basename(file_path)} 行 {line_num}: 替换ResultMap/Result column=\"{m.group('rmap_col')}\"")
+            new_text = f"{text[:col_offset]}{PREFIX}{text[col_offset:]}"
+
+        modified_lines_report.add((file_path, line_num))
+        replaced_count += 1
+        return new_text
+
+    file_aliases = tuple(sorted({alias.lower() for _, _, alias in alias_events}))
+    replace_pattern = compile_replace_pattern(patterns['replace_sources'], file_aliases)
+    new_data = replace_pattern.sub(replace_match, data)
+    file_modified = replaced_count > 0
 
     # --- 写回文件 (如果发生修改) ---
     if file_modified:
@@ -179,8 +266,7 @@ def process_and_modify_file(file_path, table_column_map, modified_lines_report):
             # shutil.copy2(file_path, backup_path) # copy2 保留元数据
             # logging.info(f"已创建备份: {backup_path}")
 
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.writelines(new_lines)
+            write_file_bytes(file_path, new_data.encode('utf-8'))
             logging.info(f"文件已修改: {file_path}")
             return True
         except Exception as e:
@@ -197,6 +283,47 @@ def process_and_modify_file(file_path, table_column_map, modified_lines_report):
         # logging.debug(f"文件无需修改: {file_path}")
         return False
 
+def iter_xml_files(directory, exclude_dirs):
+    """递归产出目录下所有 .xml 文件路径，跳过 exclude_dirs 中的目录名 (不跟随目录符号链接)。"""
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in exclude_dirs:
+                        yield from iter_xml_files(entry.path, exclude_dirs)
+                elif entry.name.endswith(XML_SUFFIXES) and entry.is_file():
+                    yield entry.path
+    except OSError as e:
+        logging.warning(f"无法读取目录 {directory}: {e}")
+
+# --- 多进程处理 ---
+# 每个文件的处理相互独立，文件数较多时分发到进程池
+
+PARALLEL_MIN_FILES = 64 # 文件数少于此值时直接在主进程处理，避免进程池启动开销
+_worker_patterns = None # 工作进程内的预编译模式，由 _init_worker 设置
+
+def _init_worker(patterns, log_level):
+    """进程池初始化: 每个工作进程只接收一次预编译模式。"""
+    global _worker_patterns
+    _worker_patterns = patterns
+    logging.getLogger().setLevel(log_level)
+
+def _process_one(file_path):
+    """进程池任务: 处理单个文件，返回 (文件路径, 是否修改, 该文件的 (文件路径, 行号) 集合)。"""
+    logging.debug(f"正在处理文件: {file_path}")
+    file_report = set()
+    modified = process_and_modify_file(file_path, _worker_patterns, file_report)
+    return file_path, modified, file_report
+
+def process_files(xml_paths, patterns):
+    """处理全部 XML 文件，逐个产出 _process_one 的结果。"""
+    if len(xml_paths) < PARALLEL_MIN_FILES:
+        _init_worker(patterns, logging.getLogger().level)
+        yield from map(_process_one, xml_paths)
+        return
+    with ProcessPoolExecutor(initializer=_init_worker, initargs=(patterns, logging.getLogger().level)) as executor:
+        yield from executor.map(_process_one, xml_paths, chunksize=32)
+
 def main():
     # --- 配置区 ---
     SCAN_DIRECTORY = r"D:\proj\b2bmanage\src\main\resources" # 【修改】MyBatis XML 文件根目录
@@ -241,29 +368,26 @@ def main():
     logging.info(f"将为以下表的字段添加 '{PREFIX}' 前缀: {table_column_map}")
     logging.info(f"排除目录: {exclude_dirs if exclude_dirs else '无'}")
 
-    modified_report = set() # 使用集合存储唯一的 "filepath:linenum"
-    file_count = 0
+    patterns = compile_target_patterns(table_column_map)
+
+    modified_report = set() # 使用集合存储唯一的 (文件路径, 行号)
     modified_file_count = 0
 
-    for root, dirs, files in os.walk(scan_directory, topdown=True):
-        dirs[:] = [d for d in dirs if d not in exclude_dirs]
+    xml_paths = list(iter_xml_files(scan_directory, exclude_dirs))
+    file_count = len(xml_paths)
 
-        for filename in files:
-            if filename.lower().endswith(".xml"):
-                file_path = os.path.join(root, filename)
-                file_count += 1
-                logging.debug(f"正在处理文件: {file_path}")
-                if process_and_modify_file(file_path, table_column_map, modified_report):
-                    modified_file_count += 1
+    for file_path, modified, file_report in process_files(xml_paths, patterns):
+        modified_report.update(file_report)
+        if modified:
+            modified_file_count += 1
 
     logging.info(f"处理完成。共检查 {file_count} 个 XML 文件，修改了 {modified_file_count} 个文件。")
 
     if modified_report:
         print("\n" + "=" * 30 + " 文件修改位置报告 (filepath:linenumber) " + "=" * 30)
-        # 排序报告以便查看
-        sorted_report = sorted(list(modified_report), key=lambda x: (x.split(':')[0], int(x.split(':')[1])))
-        for item in sorted_report:
-            print(item)
+        # 排序报告以便查看 (元组按路径、行号自然排序)
+        for file_path, line_num in sorted(modified_report):
+            print(f"{file_path}:{line_num}")
         print("\n" + "=" * 30 + " 报告结束 " + "=" * 70)
         print(f"\n总共有 {len(modified_report)} 行被修改。请在 IDE 中搜索 '{PREFIX}' 前缀来查找所有修改点并进行检查。")
     else:
@@ -1,18 +1,59 @@
+import asyncio
+import atexit
 import os
+import re
+import signal
 import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Dict, Any
-from mcp.server.fastmcp import FastMCP
+from typing import Callable, Iterator, List, Optional, Dict, Any, Set, Tuple
+from mcp.server.fastmcp import Context, FastMCP
 import logging
 
 # --- Constants ---
 DEFAULT_CONTEXT_LINES = 50
 DEFAULT_FILE_TYPES = ['.java', '.xml']  # Fixed file types
+# Derived from DEFAULT_FILE_TYPES once instead of on every tool call
+DEFAULT_PATH_FILTERS = [f"*{ft}" for ft in DEFAULT_FILE_TYPES]
+DEFAULT_FILE_TYPES_DISPLAY = ', '.join(DEFAULT_FILE_TYPES)
 GIT_COMMAND_TIMEOUT = 30  # Timeout in seconds for git commands
+MAX_DIFF_BYTES = 1_000_000  # Per-commit cap on raw `git show` output (~1 MB); the rest is replaced by a marker
+MAX_DIFF_LINES_PER_COMMIT = 5000  # Same, in lines (50 context lines make hunks long, so not much lower)
+MAX_TOTAL_REPORT_CHARS = 2_000_000  # Once the diffs in a report reach this size, remaining commits are skipped
+MAX_DIFF_FILES = 50  # Commits touching more matching files only get a `--stat` summary
+MAX_DIFF_CHANGED_LINES = 20000  # Same for commits with more inserted + deleted lines
+GIT_MAX_WORKERS = min(8, os.cpu_count() or 4)  # Concurrent per-commit git processes
+DIFF_CACHE_SIZE = 512  # Commits kept by the in-process diff cache
+
+# A full object name (SHA-1 or SHA-256), as printed by `git log --pretty=format:%H`
+FULL_SHA_PATTERN = re.compile(r"[0-9a-f]{40}|[0-9a-f]{64}")
+# The "commit <sha>" header line that starts each commit in multi-commit `git show` output.
+# Diff and message lines are always prefixed (' ', '+', '-', indentation), so this cannot hit content.
+COMMIT_HEADER_PATTERN = re.compile(rb"commit ([0-9a-f]{40,64})\b")  # Matched on raw output lines
+# The summary line of `git show --shortstat`, e.g. " 3 files changed, 10 insertions(+), 2 deletions(-)"
+SHORTSTAT_PATTERN = re.compile(r"(\d+) files? changed(?:, (\d+) insertions?\(\+\))?(?:, (\d+) deletions?\(-\))?")
+
+# Error messages built by _check_command_result
+GIT_ERROR_TEMPLATE = "{context}: Git command failed (code {code})."
+GIT_ERROR_DETAILS_TEMPLATE = GIT_ERROR_TEMPLATE + "\nDetails: {details}{ellipsis}"
+
+# Fixed header of every report; `commits` is a shortened list of the processed IDs
+REPORT_HEADER_TEMPLATE = (
+    "# Git Commit Diff Report\n"
+    "Repository: `{repo}`\n"
+    "Processing Commits: `{commits}` ({count} total)\n"
+    "Context Lines: `{context_lines}` (Fixed)\n"
+    "File Types Filtered: `{file_types}` (Fixed)\n"
+    "\n---\n"
+)
 
 # Configure logging (same as before, ensure it doesn't print to stdout)
 logger = logging.getLogger("git_diff_mcp")
-logger.addHandler(logging.NullHandler())  # Suppress logs by default
+if not logger.handlers:  # Importing the module again must not stack handlers
+    logger.addHandler(logging.NullHandler())  # Suppress logs by default
 # logger.propagate = False # Optional: Prevent propagation if root logger prints
 # If you need file logging for debugging:
 # file_handler = logging.FileHandler("git_diff_mcp.log")
@@ -22,6 +63,10 @@ logger.addHandler(logging.NullHandler())  # Suppress logs by default
 # logger.setLevel(logging.INFO)
 
 
+# Threads for per-commit git commands. Each command has its own timeout watchdog,
+# so results are awaited without an extra timeout.
+_git_pool = ThreadPoolExecutor(max_workers=GIT_MAX_WORKERS, thread_name_prefix="git_diff_mcp")
+
 # Initialize FastMCP server
 mcp = FastMCP("git_diff_mcp")
 
@@ -41,6 +86,7 @@ def _run_git_command(repo_path: str, command: List[str]) -> subprocess.Completed
             capture_output=True,
             text=True,
             encoding="utf-8",
+            errors="replace",  # File names or messages in another encoding must not fail the command
             check=False,
             stdin=subprocess.DEVNULL,  # *** CRUCIAL: Prevent git from reading stdin ***
             timeout=GIT_COMMAND_TIMEOUT  # *** ADDED: Prevent indefinite hangs ***
@@ -73,26 +119,142 @@ def _run_git_command(repo_path: str, command: List[str]) -> subprocess.Completed
         )
 
 
+def _kill_process_group(proc: subprocess.Popen) -> None:
+    """Kills a process started by _stream_git_command together with any helpers it spawned (pager, textconv)."""
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except OSError:
+        pass  # Already exited
+
+
+def _stream_git_command(
+        repo_path: str,
+        command: List[str],
+        on_line: Callable[[bytes], Optional[bool]]
+) -> subprocess.CompletedProcess:
+    """
+    Like _run_git_command, but passes stdout to `on_line` line by line while git
+    is still running instead of buffering the whole output first.
+    If `on_line` returns True, reading stops and git is killed; this counts as success.
+
+    Lines are raw bytes: callers decode only what they keep (with errors="replace"),
+    so suppressed output is never decoded and non-UTF-8 file contents cannot fail the read.
+
+    stderr goes to a temporary file so a chatty git can never block on a full pipe.
+    The returned CompletedProcess has an empty stdout and uses the same custom
+    return codes as _run_git_command, so it works with _check_command_result.
+    """
+    timed_out = threading.Event()
+    stopped_early = False
+    try:
+        with tempfile.TemporaryFile() as stderr_file:
+            proc = subprocess.Popen(
+                command,
+                cwd=repo_path,
+                stdin=subprocess.DEVNULL,  # *** CRUCIAL: Prevent git from reading stdin ***
+                stdout=subprocess.PIPE,
+                stderr=stderr_file,
+                start_new_session=(os.name == "posix"),  # Own process group, see _kill_process_group
+            )
+
+            def _kill_on_timeout():
+                timed_out.set()
+                _kill_process_group(proc)
+
+            timer = threading.Timer(GIT_COMMAND_TIMEOUT, _kill_on_timeout)
+            timer.start()
+            try:
+                with proc.stdout:
+                    for line in proc.stdout:
+                        if on_line(line):
+                            stopped_early = True
+                            _kill_process_group(proc)
+                            break
+                returncode = proc.wait()
+            finally:
+                timer.cancel()
+                if proc.poll() is None:
+                    _kill_process_group(proc)
+                    proc.wait()
+
+            stderr_file.seek(0)
+            stderr = stderr_file.read().decode("utf-8", errors="replace")
+    except FileNotFoundError:
+        return subprocess.CompletedProcess(
+            args=command,
+            returncode=-1,
+            stdout="",
+            stderr="Git command not found. Make sure Git is installed and in the system's PATH."
+        )
+    except Exception as e:
+        return subprocess.CompletedProcess(
+            args=command,
+            returncode=-2,
+            stdout="",
+            stderr=f"An unexpected error occurred while running git: {str(e)}"
+        )
+
+    if timed_out.is_set():
+        return subprocess.CompletedProcess(
+            args=command,
+            returncode=-3,
+            stdout="",
+            stderr=f"Git command timed out after {GIT_COMMAND_TIMEOUT} seconds. The repository might be very large, the command stuck, or requires interaction."
+        )
+    if stopped_early:
+        returncode = 0  # Killed on request, not a git failure
+    return subprocess.CompletedProcess(args=command, returncode=returncode, stdout="", stderr=stderr)
+
+
+def _decode_output(data: bytes) -> str:
+    """
+    Decodes raw git output collected by a _stream_git_command callback. Invalid UTF-8 is
+    replaced, and newlines are translated like a text-mode pipe does (CRLF files in diffs).
+    """
+    text = data.decode("utf-8", errors="replace")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
 def _check_command_result(result: subprocess.CompletedProcess, context_msg: str) -> Optional[str]:
     """Checks subprocess result and returns formatted error message string if failed, else None."""
     if result.returncode != 0:
-        err_msg = f"{context_msg}: Git command failed (code {result.returncode})."
         # Include stderr if it provides useful info
         if result.stderr:
-            # Limit stderr length to avoid overly long messages
-            stderr_snippet = result.stderr.strip()[:500]
-            err_msg += f"\nDetails: {stderr_snippet}"
-            if len(result.stderr.strip()) > 500:
-                err_msg += "..."
+            # Limit stderr length to avoid overly long messages. Find the stripped bounds by
+            # walking only the surrounding whitespace instead of copying a possibly huge stderr.
+            stderr = result.stderr
+            begin, end = 0, len(stderr)
+            while end > begin and stderr[end - 1].isspace():
+                end -= 1
+            while begin < end and stderr[begin].isspace():
+                begin += 1
+            return GIT_ERROR_DETAILS_TEMPLATE.format(
+                context=context_msg,
+                code=result.returncode,
+                details=stderr[begin:min(end, begin + 500)],
+                ellipsis="..." if end - begin > 500 else "",
+            )
         # Special handling for our custom error codes
         elif result.returncode == -1:  # FileNotFoundError
-            err_msg = f"{context_msg}: {result.stderr}"  # Already formatted message
+            return f"{context_msg}: {result.stderr}"  # Already formatted message
         elif result.returncode == -3:  # TimeoutExpired
-            err_msg = f"{context_msg}: {result.stderr}"  # Already formatted message
-        return err_msg
+            return f"{context_msg}: {result.stderr}"  # Already formatted message
+        return GIT_ERROR_TEMPLATE.format(context=context_msg, code=result.returncode)
     return None
 
 
+# Validated GIT_REPO_PATH values, keyed by the raw environment value so a changed
+# variable is re-validated. Only successful checks are cached (which is why this is
+# not an lru_cache), so a repository that appears later (e.g. cloned after server
+# start) is still picked up. pathlib caches str(Path) itself, so callers can convert freely.
+_validated_repo_paths: Dict[str, Path] = {}
+
+
 def _get_repo_path() -> Optional[Path]:
     """Gets and validates the GIT_REPO_PATH environment variable."""
     repo_path_str = os.environ.get("GIT_REPO_PATH")
@@ -100,6 +262,10 @@ def _get_repo_path() -> Optional[Path]:
         # logger.error("GIT_REPO_PATH environment variable not set.")
         return None  # Signal error upstream
 
+    cached = _validated_repo_paths.get(repo_path_str)
+    if cached is not None:
+        return cached
+
     repo_path = Path(repo_path_str)
     if not repo_path.is_dir():
         # logger.error(f"GIT_REPO_PATH '{repo_path_str}' is not a valid directory.")
@@ -110,74 +276,458 @@ def _get_repo_path() -> Optional[Path]:
         # logger.error(f"Directory '{repo_path_str}' does not appear to be a Git repository.")
         return None  # Signal error upstream
 
+    _validated_repo_paths[repo_path_str] = repo_path
     return repo_path
 
 
-def _generate_diff_markdown(
+# Long-lived `git cat-file --batch-check` processes, one per repository, used to
+# resolve commit IDs without forking a new git for every lookup.
+_object_resolvers: Dict[str, subprocess.Popen] = {}
+_object_resolver_lock = threading.Lock()
+
+
+def _close_object_resolvers() -> None:
+    """Terminates all cached `git cat-file` processes (registered with atexit)."""
+    with _object_resolver_lock:
+        for proc in _object_resolvers.values():
+            _kill_process_group(proc)
+            proc.wait()
+        _object_resolvers.clear()
+
+
+atexit.register(_close_object_resolvers)
+
+
+def _get_object_resolver(repo_path_str: str) -> subprocess.Popen:
+    """Returns the running `git cat-file --batch-check` for the repository, spawning it on first use. Caller holds the lock."""
+    proc = _object_resolvers.get(repo_path_str)
+    if proc is not None and proc.poll() is None:
+        return proc
+
+    proc = subprocess.Popen(
+        ["git", "cat-file", "--batch-check=%(objectname) %(objecttype)"],
+        cwd=repo_path_str,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        encoding="utf-8",
+        bufsize=1,  # Line buffered: every request line reaches git immediately
+        start_new_session=(os.name == "posix"),  # Own process group, see _kill_process_group
+    )
+    _object_resolvers[repo_path_str] = proc
+    return proc
+
+
+def _resolve_commit_ids(repo_path_str: str, commit_ids: List[str]) -> Dict[str, str]:
+    """
+    Resolves commit IDs (short hashes, refs, ...) to full SHAs through the cached
+    `git cat-file --batch-check` process of the repository.
+
+    Full SHAs (e.g. from `git log --pretty=format:%H`) are passed through without
+    asking git, so the recent-commits path never needs the cat-file process; a bad
+    one makes the batched `git show` fail, which then falls back per commit.
+
+    IDs that do not name a commit, or cannot be resolved for any other reason, are
+    missing from the returned dict; callers handle them with a regular git command,
+    which also produces git's own error message for them.
+    """
+    resolved: Dict[str, str] = {}
+    queries = []
+    for cid in dict.fromkeys(commit_ids):
+        if FULL_SHA_PATTERN.fullmatch(cid):
+            resolved[cid] = cid
+        # The batch protocol is line based, so IDs containing whitespace cannot be sent
+        elif cid and not any(c.isspace() for c in cid):
+            queries.append(cid)
+    if not queries:
+        return resolved
+
+    with _object_resolver_lock:
+        try:
+            proc = _get_object_resolver(repo_path_str)
+        except Exception:
+            return resolved  # git missing or repo not accessible, let the regular commands report it
+
+        # A wedged cat-file would block readline() forever, so guard it like _stream_git_command does
+        timer = threading.Timer(GIT_COMMAND_TIMEOUT, _kill_process_group, args=(proc,))
+        timer.start()
+        try:
+            proc.stdin.write("".join(f"{cid}^{{commit}}\n" for cid in queries))
+            proc.stdin.flush()
+            for cid in queries:
+                reply = proc.stdout.readline()
+                if not reply:
+                    raise EOFError("git cat-file exited unexpectedly")
+                # "<sha> commit" on success, "<query> missing" / "<query> ambiguous" otherwise
+                sha, _, object_type = reply.rstrip("\n").rpartition(" ")
+                if object_type == "commit" and FULL_SHA_PATTERN.fullmatch(sha):
+                    resolved[cid] = sha
+        except Exception:
+            # Out of sync or dead: drop the process, the next call spawns a fresh one
+            _kill_process_group(proc)
+            proc.wait()
+            _object_resolvers.pop(repo_path_str, None)
+            return {cid: sha for cid, sha in resolved.items() if cid not in queries}
+        finally:
+            timer.cancel()
+    return resolved
+
+
+def _fetch_commit_diffs_batch(
+        repo_path_str: str,
+        commit_ids: List[str],
+        context_lines: int,
+        path_filters: List[str]
+) -> Optional[Dict[str, Tuple[str, bool, str]]]:
+    """
+    Fetches the output of several commits with a single `git show` process.
+
+    Every ID must be a full SHA (see _resolve_commit_ids), so the "commit <sha>"
+    headers in the output can be matched back to the requested IDs. Commits without
+    changes matching the filters are omitted by git and are therefore missing from the dict.
+
+    Returns:
+        Dict mapping each SHA to its (stripped) `git show` output, capped at
+        MAX_DIFF_LINES_PER_COMMIT / MAX_DIFF_BYTES, whether that output contains a
+        file diff, and a truncation note ("" if complete); or None if the batch
+        cannot be used and the caller should run one `git show` per commit.
+    """
+    if not commit_ids or not all(FULL_SHA_PATTERN.fullmatch(cid) for cid in commit_ids):
+        return None
+
+    # The output is split on "commit <sha>" headers, so pin the format a user's format.pretty could change
+    cmd = ["git", "show", "--no-color", "--pretty=medium", f"--unified={context_lines}"]
+    cmd.extend(dict.fromkeys(commit_ids))  # De-duplicate, keep order
+    cmd.append("--")
+    cmd.extend(path_filters)
+
+    # Collect lines per commit while git streams its output
+    lines_by_sha: Dict[str, List[bytes]] = {}
+    counts_by_sha: Dict[str, List[int]] = {}  # [lines seen, bytes seen, bytes kept]
+    # Noted while streaming, so the report does not have to search the (possibly huge) output again
+    shas_with_diff = set()
+    current_lines: List[bytes] = []
+    current_sha = ""
+
+    def _collect(line: bytes) -> None:
+        nonlocal current_lines, current_sha
+        # Cheap prefix test first, so the regex only runs on candidate header lines
+        if line.startswith(b"commit "):
+            header = COMMIT_HEADER_PATTERN.match(line)
+            if header:
+                current_sha = header.group(1).decode("ascii")
+                current_lines = lines_by_sha.setdefault(current_sha, [])
+        # Past the caps, keep reading (later commits follow) but stop storing this one
+        counts = counts_by_sha.setdefault(current_sha, [0, 0, 0])
+        counts[0] += 1
+        counts[1] += len(line)
+        if counts[0] <= MAX_DIFF_LINES_PER_COMMIT and counts[1] <= MAX_DIFF_BYTES:
+            current_lines.append(line)
+            counts[2] = counts[1]
+            if line.startswith(b"diff --git"):
+                shas_with_diff.add(current_sha)
+
+    result = _stream_git_command(repo_path_str, cmd, _collect)
+    if result.returncode != 0:
+        return None
+
+    diffs: Dict[str, Tuple[str, bool, str]] = {}
+    for sha, lines in lines_by_sha.items():
+        lines_seen, bytes_seen, bytes_kept = counts_by_sha[sha]
+        truncation_note = ""
+        if lines_seen > len(lines):
+            truncation_note = (
+                f"{lines_seen - len(lines)} more lines ({bytes_seen - bytes_kept} bytes) exceed the "
+                f"per-commit limit of {MAX_DIFF_LINES_PER_COMMIT} lines / {MAX_DIFF_BYTES} bytes")
+        diffs[sha] = (_decode_output(b"".join(lines)).strip(), sha in shas_with_diff, truncation_note)
+    return diffs
+
+
+# Commits are immutable, so the `git show` output for a full SHA and fixed options never
+# goes stale. Keyed by (repo path, SHA, context lines, path filters), least recently used first.
+DiffCacheKey = Tuple[str, str, int, Tuple[str, ...]]
+_diff_cache: "OrderedDict[DiffCacheKey, Tuple[str, bool, str]]" = OrderedDict()
+_diff_cache_lock = threading.Lock()
+_diff_cache_stats = {"hits": 0, "misses": 0}
+
+
+def _get_cached_diffs(
+        repo_path_str: str,
+        shas: List[str],
+        context_lines: int,
+        path_filters: List[str]
+) -> Dict[str, Tuple[str, bool, str]]:
+    """Returns the cached _fetch_commit_diffs_batch entries for the given full SHAs."""
+    filters_key = tuple(path_filters)
+    cached: Dict[str, Tuple[str, bool, str]] = {}
+    with _diff_cache_lock:
+        for sha in shas:
+            key = (repo_path_str, sha, context_lines, filters_key)
+            entry = _diff_cache.get(key)
+            if entry is None:
+                _diff_cache_stats["misses"] += 1
+                continue
+            _diff_cache.move_to_end(key)
+            _diff_cache_stats["hits"] += 1
+            cached[sha] = entry
+    return cached
+
+
+def _store_cached_diffs(
+        repo_path_str: str,
+        diffs: Dict[str, Tuple[str, bool, str]],
+        context_lines: int,
+        path_filters: List[str]
+) -> None:
+    """Adds _fetch_commit_diffs_batch entries to the cache, evicting the least recently used ones."""
+    filters_key = tuple(path_filters)
+    with _diff_cache_lock:
+        for sha, entry in diffs.items():
+            key = (repo_path_str, sha, context_lines, filters_key)
+            _diff_cache[key] = entry
+            _diff_cache.move_to_end(key)
+        while len(_diff_cache) > DIFF_CACHE_SIZE:
+            _diff_cache.popitem(last=False)
+
+
+def _probe_commits(
+        repo_path_str: str,
+        commit_ids: List[str],
+        path_filters: List[str]
+) -> Optional[Tuple[Set[str], Dict[str, Tuple[int, int]]]]:
+    """
+    Probes several commits with a single cheap `git show --shortstat`, so commits
+    without matching files can skip the full `git show` and mega-commits can be
+    summarized instead of producing a huge diff.
+
+    Args:
+        commit_ids: Full SHAs (see _resolve_commit_ids).
+
+    Returns:
+        (SHAs git shows at all for the filters, dict mapping the SHA of each commit
+        above MAX_DIFF_FILES / MAX_DIFF_CHANGED_LINES to its (files changed, lines
+        changed)), or None if the probe fails.
+    """
+    cmd = ["git", "show", "--shortstat", "--format=%H"]
+    cmd.extend(commit_ids)
+    cmd.append("--")
+    cmd.extend(path_filters)
+
+    # Same pathspec as the full `git show`, so git prunes exactly the same commits here
+    shown: Set[str] = set()
+    oversized: Dict[str, Tuple[int, int]] = {}
+    current_sha = ""
+
+    def _collect(raw_line: bytes) -> None:
+        nonlocal current_sha
+        line = raw_line.decode("ascii", errors="replace").strip()  # Only SHAs and stat summaries
+        if FULL_SHA_PATTERN.fullmatch(line):
+            current_sha = line
+            shown.add(line)
+            return
+        stat = SHORTSTAT_PATTERN.search(line)
+        if stat and current_sha:
+            files_changed = int(stat.group(1))
+            lines_changed = int(stat.group(2) or 0) + int(stat.group(3) or 0)
+            if files_changed > MAX_DIFF_FILES or lines_changed > MAX_DIFF_CHANGED_LINES:
+                oversized[current_sha] = (files_changed, lines_changed)
+
+    result = _stream_git_command(repo_path_str, cmd, _collect)
+    if result.returncode != 0:
+        return None  # No filtering or gating, the diff itself still reports any problem
+    return shown, oversized
+
+
+def _show_single_commit(
+        repo_path_str: str,
+        commit_id: str,
+        stat_sha: Optional[str],
+        context_lines: int,
+        path_filters: List[str]
+) -> Tuple[Optional[str], str, bool, str]:
+    """
+    Runs `git show` for one commit outside the batch. Runs on _git_pool.
+
+    Args:
+        stat_sha: Full SHA of a mega-commit (see _probe_commits) to get
+            only its `--stat` summary (first MAX_DIFF_FILES files), or None for
+            the full diff of `commit_id`.
+
+    Returns:
+        (error message or None, capped output, whether it contains a file diff,
+        truncation note or "" if complete); see _fetch_commit_diffs_batch for the caps.
+    """
+    if stat_sha is not None:
+        # At most MAX_DIFF_FILES file lines, and streamed under the same caps as a diff,
+        # so the summary of a mega-commit stays small however many files it touches
+        cmd = ["git", "show", "--stat", f"--stat-count={MAX_DIFF_FILES}", "--no-color", stat_sha, "--"]
+    else:
+        cmd = [
+            "git",
+            "show",
+            "--no-color",
+            f"--unified={context_lines}",
+            commit_id,
+            "--",
+        ]
+    cmd.extend(path_filters)
+
+    collected: List[bytes] = []
+    collected_size = 0
+    has_diff = False
+    truncation_note = ""
+
+    def _collect(line: bytes) -> Optional[bool]:
+        nonlocal collected_size, has_diff, truncation_note
+        collected_size += len(line)
+        if len(collected) >= MAX_DIFF_LINES_PER_COMMIT or collected_size > MAX_DIFF_BYTES:
+            truncation_note = (
+                f"the output exceeds the per-commit limit of {MAX_DIFF_LINES_PER_COMMIT} lines / {MAX_DIFF_BYTES} bytes")
+            return True  # Nothing else of this commit is needed, stop git
+        collected.append(line)
+        if line.startswith(b"diff --git"):
+            has_diff = True
+        return None
+
+    result = _stream_git_command(repo_path_str, cmd, _collect)
+
+    # Check for errors during git show execution
+    error = _check_command_result(result, f"Processing commit `{commit_id}`")
+    # A `--stat` summary never contains a file diff
+    return error, _decode_output(b"".join(collected)), has_diff and stat_sha is None, truncation_note
+
+
+def _iter_diff_markdown(
         commit_ids: List[str],
         repo_path: Path,
         context_lines: int,
         file_types: List[str]
-) -> str:
+) -> Iterator[str]:
     """
     Core logic to fetch diffs for given commit IDs and format as Markdown.
+
+    Yields the report in blocks as it is produced: the header, one block per
+    commit, and the closing summary. "\n".join() of all blocks is the full report.
     """
-    path_filters = [f"*{ft}" for ft in file_types]
+    if file_types is DEFAULT_FILE_TYPES:
+        path_filters = DEFAULT_PATH_FILTERS
+        file_types_display = DEFAULT_FILE_TYPES_DISPLAY
+    else:
+        path_filters = [f"*{ft}" for ft in file_types]
+        file_types_display = ', '.join(file_types)
     repo_path_str = str(repo_path)  # For display
 
-    markdown_output_parts = []
-    markdown_output_parts.append(f"# Git Commit Diff Report")
-    markdown_output_parts.append(f"Repository: `{repo_path_str}`")
     # Be careful listing too many commit IDs here if the list is huge
     commits_display = ' '.join(commit_ids[:5]) + ('...' if len(commit_ids) > 5 else '')
-    markdown_output_parts.append(f"Processing Commits: `{commits_display}` ({len(commit_ids)} total)")
-    markdown_output_parts.append(f"Context Lines: `{context_lines}` (Fixed)")
-    markdown_output_parts.append(f"File Types Filtered: `{', '.join(file_types)}` (Fixed)")
-    markdown_output_parts.append("\n---\n")
+    yield REPORT_HEADER_TEMPLATE.format(
+        repo=repo_path_str,
+        commits=commits_display,
+        count=len(commit_ids),
+        context_lines=context_lines,
+        file_types=file_types_display,
+    )
+    markdown_output_parts = []
 
     has_content = False
     commit_errors = []  # Collect errors per commit
 
+    # One `git show` for all resolvable commits, instead of one process per commit.
+    # IDs that cannot be resolved keep going through their own `git show`, which reports the error.
+    commit_ids = [commit_id.strip() for commit_id in commit_ids]
+    resolved_shas = _resolve_commit_ids(repo_path_str, commit_ids)
+    unique_shas = list(dict.fromkeys(resolved_shas.values()))
+    # Commits seen before need no git at all
+    cached_diffs = _get_cached_diffs(repo_path_str, unique_shas, context_lines, path_filters)
+    uncached_shas = [sha for sha in unique_shas if sha not in cached_diffs]
+    probe = _probe_commits(repo_path_str, uncached_shas, path_filters) if uncached_shas else None
+    shown_shas, oversized_stats = probe if probe is not None else (set(uncached_shas), {})
+    # Commits git does not show for the filters (no matching files) need no `git show` at all,
+    # and mega-commits only get a `--stat` summary, so both are left out of the full diff
+    batch_shas = [sha for sha in uncached_shas if sha in shown_shas and sha not in oversized_stats]
+    batch_diffs = _fetch_commit_diffs_batch(repo_path_str, batch_shas, context_lines, path_filters) if batch_shas else {}
+    if batch_diffs is None:
+        # Batch failed, fall back to one `git show` per commit for everything not cached
+        resolved_shas = {cid: sha for cid, sha in resolved_shas.items() if sha in cached_diffs}
+        batch_diffs = cached_diffs
+    else:
+        # Commits git left out (no matching files) are cached as empty output, like .get() below reads them
+        _store_cached_diffs(
+            repo_path_str,
+            {sha: batch_diffs.get(sha, ("", False, "")) for sha in uncached_shas if sha not in oversized_stats},
+            context_lines,
+            path_filters
+        )
+        batch_diffs.update(cached_diffs)
+
+    # Commits outside the batch (unresolved IDs, mega-commits) need their own git process;
+    # start them all at once on the pool and collect the results in input order below.
+    single_commit_results: Dict[str, Future] = {}
     for commit_id in commit_ids:
+        sha = resolved_shas.get(commit_id)
+        if commit_id and commit_id not in single_commit_results and (sha is None or sha in oversized_stats):
+            single_commit_results[commit_id] = _git_pool.submit(
+                _show_single_commit, repo_path_str, commit_id, sha if sha in oversized_stats else None,
+                context_lines, path_filters)
+
+    report_chars = 0  # Size of the diffs added so far, for MAX_TOTAL_REPORT_CHARS
+    skipped_commits = 0
+    for index, commit_id in enumerate(commit_ids):
         commit_id = commit_id.strip()
         if not commit_id:
             continue
 
+        if report_chars > MAX_TOTAL_REPORT_CHARS:
+            skipped_commits = sum(1 for remaining_id in commit_ids[index:] if remaining_id)
+            for future in single_commit_results.values():
+                future.cancel()  # Not started yet, not needed anymore
+            break
+
         # logger.info(f"Processing commit: {commit_id}")
         markdown_output_parts.append(f"## Commit: `{commit_id}`\n")
 
         try:
-            cmd = [
-                "git",
-                "show",
-                "--no-color",
-                f"--unified={context_lines}",
-                commit_id,
-                "--",
-            ]
-            cmd.extend(path_filters)
-
-            result = _run_git_command(repo_path_str, cmd)
-
-            # Check for errors during git show execution
-            error = _check_command_result(result, f"Processing commit `{commit_id}`")
+            sha = resolved_shas.get(commit_id)
+            omitted_stats = oversized_stats.get(sha)
+            if commit_id in single_commit_results:
+                error, stdout, has_diff, truncation_note = single_commit_results[commit_id].result()
+            else:
+                error = None
+                stdout, has_diff, truncation_note = batch_diffs.get(sha, ("", False, ""))
+
             if error:
                 commit_errors.append(error)
                 markdown_output_parts.append(f"**Error:**\n```\n{error}\n```\n")
 
+            elif omitted_stats is not None:
+                files_changed, lines_changed = omitted_stats
+                stat_summary = stdout.strip()
+                markdown_output_parts.append(f"```\n{stat_summary}\n```\n")
+                if truncation_note:
+                    markdown_output_parts.append(f"*(Summary truncated: {truncation_note})*\n")
+                markdown_output_parts.append(
+                    f"*(Full diff omitted: {files_changed} files and {lines_changed} changed lines exceed the limits "
+                    f"of {MAX_DIFF_FILES} files / {MAX_DIFF_CHANGED_LINES} lines)*\n")
+                report_chars += len(stat_summary)
+                has_content = True
+
             # Process successful or partially successful execution
-            elif result.stdout:
-                diff_content = result.stdout.strip()
-                if "diff --git" in diff_content:
+            elif stdout:
+                diff_content = stdout.strip()
+                if has_diff:
                     markdown_output_parts.append(f"```diff\n{diff_content}\n```\n")
+                    if truncation_note:
+                        markdown_output_parts.append(f"*(Diff truncated: {truncation_note})*\n")
+                    report_chars += len(diff_content)
                     has_content = True
                 else:
                     # Git show succeeded but no files matched the filters
-                    commit_header = diff_content.split('diff --git')[0].strip()
+                    # No "diff --git" in the output, so all of it is the (already stripped) commit header
+                    commit_header = diff_content
                     if commit_header:
                         markdown_output_parts.append(f"```\n{commit_header}\n```\n")
                     markdown_output_parts.append(
-                        f"*(No changes matching file filters `{', '.join(file_types)}` found in this commit)*\n")
+                        f"*(No changes matching file filters `{file_types_display}` found in this commit)*\n")
             else:
                 markdown_output_parts.append(
                     f"*(No output returned for commit `{commit_id}`. This might indicate an empty commit or issue with filters.)*\n")
@@ -190,6 +740,16 @@ def _generate_diff_markdown(
 
         markdown_output_parts.append("---\n")  # Separator between commits
 
+        # This commit is complete, hand it out before working on the next one
+        yield "\n".join(markdown_output_parts)
+        markdown_output_parts = []
+
+    if skipped_commits:
+        markdown_output_parts.append(
+            f"*(Report size limit of {MAX_TOTAL_REPORT_CHARS} characters reached: "
+            f"the remaining {skipped_commits} commits were skipped)*\n")
+        markdown_output_parts.append("---\n")
+
     # Add a summary section for errors encountered
     if commit_errors:
         markdown_output_parts.append("## Processing Errors Summary\n")
@@ -204,13 +764,41 @@ def _generate_diff_markdown(
         markdown_output_parts.append(
             "\n*Summary: No matching code changes were found, and some errors occurred during processing.*")
 
-    return "\n".join(markdown_output_parts)
+    if markdown_output_parts:
+        yield "\n".join(markdown_output_parts)
+
+
+async def _render_diff_report(commit_ids: List[str], repo_path: Path, ctx: Optional[Context]) -> str:
+    """
+    Builds the report with _iter_diff_markdown, using the fixed context lines and file types.
+
+    Each block is produced in a worker thread, because it blocks on git, so the event loop
+    keeps serving other tool calls. After every block an MCP progress notification is sent
+    (if the client asked for progress), so long reviews show per-commit progress. The MCP
+    tool result itself is a single message, so the blocks are joined at the end.
+    """
+    blocks = _iter_diff_markdown(
+        commit_ids=commit_ids,
+        repo_path=repo_path,
+        context_lines=DEFAULT_CONTEXT_LINES,
+        file_types=DEFAULT_FILE_TYPES
+    )
+    parts = []
+    total = len(commit_ids)
+    while True:
+        block = await asyncio.to_thread(next, blocks, None)
+        if block is None:
+            break
+        parts.append(block)
+        if ctx is not None:
+            await ctx.report_progress(min(len(parts) - 1, total), total)  # The first block is the header
+    return "\n".join(parts)
 
 
 # --- MCP Tools ---
 
 @mcp.tool()
-def get_recent_commits_diff(recent_count: int = 1) -> str:
+async def get_recent_commits_diff(recent_count: int = 1, ctx: Context = None) -> str:
     """
     Retrieves diffs for the N most recent commits on the current branch.
 
@@ -238,7 +826,7 @@ def get_recent_commits_diff(recent_count: int = 1) -> str:
 
     # Get the hashes of the most recent N commits
     cmd_log = ["git", "log", f"-n{recent_count}", "--pretty=format:%H", "HEAD"]
-    result_log = _run_git_command(str(repo_path), cmd_log)
+    result_log = await asyncio.to_thread(_run_git_command, str(repo_path), cmd_log)
 
     error_log = _check_command_result(result_log, "Error fetching recent commit IDs")
     if error_log:
@@ -252,16 +840,11 @@ def get_recent_commits_diff(recent_count: int = 1) -> str:
         return "# Git Commit Diff Report\n*No recent commits found in the repository.*\n"
 
     # Call the core markdown generation function
-    return _generate_diff_markdown(
-        commit_ids=commit_ids,
-        repo_path=repo_path,
-        context_lines=DEFAULT_CONTEXT_LINES,
-        file_types=DEFAULT_FILE_TYPES
-    )
+    return await _render_diff_report(commit_ids, repo_path, ctx)
 
 
 @mcp.tool()
-def get_specific_commits_diff(commit_ids: List[str]) -> str:
+async def get_specific_commits_diff(commit_ids: List[str], ctx: Context = None) -> str:
     """
     Retrieves diffs for a specific list of commit IDs.
 
@@ -306,12 +889,25 @@ def get_specific_commits_diff(commit_ids: List[str]) -> str:
         # For now, we just proceed with the valid ones.
 
     # Call the core markdown generation function
-    return _generate_diff_markdown(
-        commit_ids=valid_ids,  # Use only the valid IDs
-        repo_path=repo_path,
-        context_lines=DEFAULT_CONTEXT_LINES,
-        file_types=DEFAULT_FILE_TYPES
-    )
+    return await _render_diff_report(valid_ids, repo_path, ctx)  # Use only the valid IDs
+
+
+@mcp.tool()
+def get_cache_info() -> str:
+    """
+    Reports the state of the in-process diff cache.
+
+    Diffs of already fetched commits are served from memory, since a commit
+    never changes. Useful to check whether repeated reviews hit the cache.
+
+    Returns:
+        str: Number of cached commits, the cache limit, and hit/miss counts.
+    """
+    with _diff_cache_lock:
+        size = len(_diff_cache)
+        hits = _diff_cache_stats["hits"]
+        misses = _diff_cache_stats["misses"]
+    return f"Diff cache: {size}/{DIFF_CACHE_SIZE} commits cached, {hits} hits, {misses} misses."
 
 
 # --- MCP Runner ---
@@ -1,9 +1,28 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import logging
-from typing import Any, Dict, List, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import batched, islice
+from urllib.parse import urlparse
+from typing import Any, Dict, Iterator, List, Optional
 
-from .config import ANKI_CONNECT_URL, logger
+from .config import ANKI_CONNECT_URL, TTS_MAX_WORKERS, logger
+
+# orjson is optional: it encodes/decodes the large base64 media payloads much faster and works on bytes directly.
+# Both variants take a Python object / bytes and raise json.JSONDecodeError (orjson's error subclasses it).
+try:
+    import orjson
+
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    _loads = json.loads
 
 class AnkiConnectClient:
     """Client for interacting with the AnkiConnect addon."""
@@ -11,7 +30,31 @@ class AnkiConnectClient:
     def __init__(self, url: str = ANKI_CONNECT_URL, version: int = 6):
         self.url = url
         self.version = version
+        # Anki can only read files by path when it runs on this machine
+        self.is_local = urlparse(url).hostname in ("127.0.0.1", "localhost", "::1")
         self.logger = logger # Use shared logger
+        # One keep-alive connection for all calls instead of a new TCP connection per request.
+        # Retry only covers connection errors (urllib3 does not retry POST on status codes by default),
+        # which keeps non-idempotent actions like addNote from being sent twice.
+        # The pool holds a connection per concurrent caller (TTS threads upload media in parallel), so none are discarded.
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=max(4, TTS_MAX_WORKERS),
+            max_retries=Retry(total=2, backoff_factor=0.1)
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def close(self) -> None:
+        """Closes the pooled HTTP connection."""
+        self._session.close()
+
+    def __enter__(self) -> "AnkiConnectClient":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
 
     def _invoke(self, action: str, params: Optional[Dict[str, Any]] = None) -> Any:
         """Sends a request to AnkiConnect."""
@@ -19,21 +62,29 @@ class AnkiConnectClient:
         if params is not None:
             payload["params"] = params
 
-        self.logger.debug(f"Invoking AnkiConnect: action={action}, params={params}")
+        # Guarded: params/results can hold megabytes of base64, which the f-string would format even with debug off
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Invoking AnkiConnect: action={action}, params={params}")
         try:
-            response = requests.post(self.url, json=payload, timeout=30) # Added timeout
+            response = self._session.post(
+                self.url,
+                data=_dumps(payload),
+                headers={"Content-Type": "application/json"},
+                timeout=30 # Added timeout
+            )
             response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
         except requests.exceptions.RequestException as e:
             self.logger.error(f"AnkiConnect request failed: {e}", exc_info=True)
             raise ConnectionError(f"Failed to connect to AnkiConnect at {self.url}. Is Anki running with AnkiConnect installed and enabled?") from e
 
         try:
-            result = response.json()
+            result = _loads(response.content) # Bytes, skips decoding response.text
         except json.JSONDecodeError as e:
             self.logger.error(f"Failed to decode AnkiConnect response: {response.text}", exc_info=True)
             raise ValueError("Invalid JSON response received from AnkiConnect.") from e
 
-        self.logger.debug(f"AnkiConnect response: {result}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"AnkiConnect response: {result}")
 
         if "error" in result and result["error"] is not None:
             error_message = f"AnkiConnect error for action '{action}': {result['error']}"
@@ -48,9 +99,10 @@ class AnkiConnectClient:
 
         return result["result"]
 
-    def add_note(self, deck_name: str, model_name: str, fields: Dict[str, str], tags: Optional[List[str]] = None) -> int:
-        """Adds a new note to Anki."""
-        note = {
+    @staticmethod
+    def build_note(deck_name: str, model_name: str, fields: Dict[str, str], tags: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Builds the note payload used by addNote, addNotes and canAddNotes."""
+        return {
             "deckName": deck_name,
             "modelName": model_name,
             "fields": fields,
@@ -60,6 +112,10 @@ class AnkiConnectClient:
             },
             "tags": tags or []
         }
+
+    def add_note(self, deck_name: str, model_name: str, fields: Dict[str, str], tags: Optional[List[str]] = None) -> int:
+        """Adds a new note to Anki."""
+        note = self.build_note(deck_name, model_name, fields, tags)
         try:
             note_id = self._invoke("addNote", {"note": note})
             if not isinstance(note_id, int):
@@ -75,6 +131,41 @@ class AnkiConnectClient:
             self.logger.error(f"Failed to add note for field '{fields.get('Word', 'N/A')}': {e}", exc_info=False) # Log less verbosely here
             raise # Re-raise the original exception
 
+    def can_add_notes(self, notes: List[Dict[str, Any]]) -> List[bool]:
+        """Checks which notes (see build_note) can be added, e.g. are not duplicates, in one request."""
+        if not notes:
+            return []
+        try:
+            addable = self._invoke("canAddNotes", {"notes": notes})
+            if not isinstance(addable, list) or len(addable) != len(notes):
+                raise ValueError(f"AnkiConnect canAddNotes returned unexpected result: {addable}")
+            return [bool(ok) for ok in addable]
+        except Exception as e:
+            self.logger.error(f"Failed to check {len(notes)} notes: {e}", exc_info=True)
+            raise
+
+    def add_notes(self, notes: List[Dict[str, Any]]) -> List[Optional[int]]:
+        """
+        Adds several notes (see build_note) with a single addNotes request.
+        Returns the note ID for each note, or None where Anki did not create it.
+        """
+        if not notes:
+            return []
+        try:
+            note_ids = self._invoke("addNotes", {"notes": notes})
+            if not isinstance(note_ids, list) or len(note_ids) != len(notes):
+                raise ValueError(f"AnkiConnect addNotes returned unexpected result: {note_ids}")
+            for note, note_id in zip(notes, note_ids):
+                if note_id is None:
+                    self.logger.warning(f"addNotes returned null for field '{note['fields'].get('Word', 'N/A')}', possibly a duplicate.")
+                elif not isinstance(note_id, int):
+                    raise ValueError(f"AnkiConnect addNotes returned unexpected type: {type(note_id)}")
+            self.logger.info(f"Added {sum(1 for note_id in note_ids if note_id is not None)}/{len(notes)} notes in one request.")
+            return note_ids
+        except Exception as e:
+            self.logger.error(f"Failed to add {len(notes)} notes: {e}", exc_info=False) # Log less verbosely here
+            raise
+
     def store_media_file(self, filename: str, data_base64: str) -> str:
         """Stores a media file (base64 encoded) in Anki's collection."""
         try:
@@ -85,6 +176,19 @@ class AnkiConnectClient:
             self.logger.error(f"Failed to store media file '{filename}': {e}", exc_info=True)
             raise
 
+    def store_media_file_from_path(self, filename: str, src_path: str) -> str:
+        """
+        Stores a local file in Anki's collection by absolute path. Anki reads the file itself,
+        so no base64 data goes over HTTP. Only usable when is_local is True.
+        """
+        try:
+            result = self._invoke("storeMediaFile", {"filename": filename, "path": src_path})
+            self.logger.info(f"Stored media file '{filename}' in Anki from '{src_path}'.")
+            return str(result) # Should return filename on success
+        except Exception as e:
+            self.logger.error(f"Failed to store media file '{filename}' from '{src_path}': {e}", exc_info=True)
+            raise
+
     def get_media_files_names(self, pattern: str = "*") -> List[str]:
         """Gets a list of media filenames matching a pattern."""
         try:
@@ -121,3 +225,18 @@ class AnkiConnectClient:
         except Exception as e:
             self.logger.error(f"Failed to get info for {len(note_ids)} notes: {e}", exc_info=True)
             raise
+
+    def iter_notes_info(self, note_ids: List[int], chunk_size: int = 1000, max_workers: int = 4) -> Iterator[Dict[str, Any]]:
+        """
+        Yields detailed note information in note_ids order, fetched in chunks of chunk_size with up to
+        max_workers notesInfo requests in flight (within the session's pool), so no single response holds the whole deck.
+        """
+        chunks = batched(note_ids, chunk_size)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="notes-info") as executor:
+            pending = deque(executor.submit(self.get_notes_info, list(chunk)) for chunk in islice(chunks, max_workers))
+            while pending:
+                notes_info = pending.popleft().result()
+                next_chunk = next(chunks, None)
+                if next_chunk is not None:
+                    pending.append(executor.submit(self.get_notes_info, list(next_chunk)))
+                yield from notes_info
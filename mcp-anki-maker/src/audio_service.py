@@ -1,13 +1,66 @@
 import base64
+import json
 import logging
+import mmap
+import os
+import threading
+import time
+from collections import deque
 from pathlib import Path
-from typing import Optional, Set # Corrected import
+from typing import Deque, Optional, Set, Tuple # Corrected import
 from openai import OpenAI, APIError, RateLimitError
 
-from .config import AUDIO_DIR, logger
+from .config import AUDIO_DIR, MEDIA_CACHE_FILE, MEDIA_UPLOADS_FILE, TTS_MAX_RPM, TTS_MAX_CPM, logger
 from .utils import format_word_for_filename, get_stable_hash
 from .anki_connect import AnkiConnectClient
 
+# pybase64 is optional: a drop-in SIMD base64 encoder, several times faster on MP3-sized payloads.
+# Both variants take any bytes-like object (bytes, mmap) and return the ASCII str AnkiConnect expects.
+try:
+    import pybase64
+
+    _b64encode = pybase64.b64encode_as_string
+except ImportError:
+    def _b64encode(data) -> str:
+        return base64.b64encode(data).decode('ascii')
+
+# Read size when streaming TTS audio to disk
+AUDIO_CHUNK_SIZE = 64 * 1024
+
+class RateLimiter:
+    """
+    Thread-safe sliding-window limiter for requests and characters per minute.
+    acquire() blocks until a request fits both budgets, so TTS calls are delayed
+    before OpenAI rejects them instead of failing with a 429. A limit of 0 disables it.
+    """
+
+    def __init__(self, max_rpm: int, max_cpm: int, window_seconds: float = 60.0):
+        self.max_rpm = max_rpm
+        self.max_cpm = max_cpm
+        self.window_seconds = window_seconds
+        self._events: Deque[Tuple[float, int]] = deque() # (monotonic time, characters) per request in the window
+        self._chars_in_window = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, char_count: int) -> None:
+        """Waits until a request of char_count characters may be sent, then records it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._events and now - self._events[0][0] >= self.window_seconds:
+                    _, chars = self._events.popleft()
+                    self._chars_in_window -= chars
+                rpm_ok = not self.max_rpm or len(self._events) < self.max_rpm
+                # An empty window always admits, so a single text above max_cpm cannot block forever
+                cpm_ok = not self.max_cpm or not self._events or self._chars_in_window + char_count <= self.max_cpm
+                if rpm_ok and cpm_ok:
+                    self._events.append((now, char_count))
+                    self._chars_in_window += char_count
+                    return
+                wait_seconds = self._events[0][0] + self.window_seconds - now
+            time.sleep(max(wait_seconds, 0.01))
+
+
 class AudioService:
     """Handles TTS generation and caching (Synchronous)."""
 
@@ -17,15 +70,63 @@ class AudioService:
         self.audio_dir = AUDIO_DIR
         self.logger = logger
         self._anki_media_cache: Optional[Set[str]] = None # Cache Anki media files
+        self._anki_media_cache_time = 0.0 # Wall-clock time the cached list was fetched from Anki
+        self.tts_limiter = RateLimiter(TTS_MAX_RPM, TTS_MAX_CPM) # Shared by all TTS threads
+        self._uploads_lock = threading.Lock() # Serializes appends to MEDIA_UPLOADS_FILE from TTS threads
 
-    def _get_anki_media_files(self, force_refresh: bool = False) -> Set[str]:
-        """Gets and caches the list of media files from Anki (Synchronous)."""
-        if self._anki_media_cache is None or force_refresh:
+    def _load_persisted_media_files(self) -> None:
+        """Loads the media list saved by an earlier process, so a restart does not always re-fetch it."""
+        try:
+            fetched_at = MEDIA_CACHE_FILE.stat().st_mtime
+            with open(MEDIA_CACHE_FILE, "r", encoding="utf-8") as f:
+                filenames = json.load(f)
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                self.logger.warning(f"Ignoring unreadable media cache file '{MEDIA_CACHE_FILE}': {e}")
+            return
+        self._anki_media_cache = set(filenames)
+        self._anki_media_cache_time = fetched_at
+        # Files uploaded after that list was fetched
+        try:
+            with open(MEDIA_UPLOADS_FILE, "r", encoding="utf-8") as f:
+                self._anki_media_cache.update(line.rstrip("\n") for line in f if line.strip())
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.logger.warning(f"Ignoring unreadable media uploads file '{MEDIA_UPLOADS_FILE}': {e}")
+        self.logger.debug(f"Loaded {len(self._anki_media_cache)} Anki media filenames from {MEDIA_CACHE_FILE}.")
+
+    def _persist_media_files(self) -> None:
+        """
+        Atomically rewrites the persisted media list; its mtime records when the list was fetched.
+        The fresh list already contains every earlier upload, so the uploads file starts over.
+        """
+        tmp_path = MEDIA_CACHE_FILE.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(sorted(self._anki_media_cache), f)
+            with self._uploads_lock:
+                os.replace(tmp_path, MEDIA_CACHE_FILE)
+                MEDIA_UPLOADS_FILE.unlink(missing_ok=True)
+        except OSError as e:
+            self.logger.warning(f"Failed to persist media cache file '{MEDIA_CACHE_FILE}': {e}")
+
+    def _get_anki_media_files(self, force_refresh: bool = False, max_age: Optional[float] = None) -> Set[str]:
+        """
+        Gets and caches the list of media files from Anki (Synchronous).
+        The cache survives restarts via MEDIA_CACHE_FILE; max_age (seconds) re-fetches a list older than that.
+        """
+        if self._anki_media_cache is None and not force_refresh:
+            self._load_persisted_media_files()
+        stale = max_age is not None and time.time() - self._anki_media_cache_time > max_age
+        if self._anki_media_cache is None or force_refresh or stale:
             try:
                 self.logger.debug("Fetching media file list from Anki...")
                 filenames = self.anki.get_media_files_names() # Direct sync call
                 self._anki_media_cache = set(filenames)
+                self._anki_media_cache_time = time.time()
                 self.logger.debug(f"Cached {len(self._anki_media_cache)} Anki media filenames.")
+                self._persist_media_files()
             except Exception as e:
                 self.logger.error(f"Failed to get Anki media files: {e}. Audio caching might be incomplete.", exc_info=True)
                 return set() # Return empty set on error
@@ -33,54 +134,118 @@ class AudioService:
         return self._anki_media_cache if self._anki_media_cache is not None else set()
 
 
-    def create_audio_file(self, text: str, word: str, audio_type: str) -> str:
+    def _mark_in_anki(self, audio_filename: str) -> None:
+        """
+        Adds a just-uploaded file to the media cache (if loaded), so no full refresh is needed.
+        It is also appended to MEDIA_UPLOADS_FILE, so that after a restart the persisted list still knows about it.
+        """
+        if self._anki_media_cache is not None:
+            self._anki_media_cache.add(audio_filename)
+        try:
+            with self._uploads_lock, open(MEDIA_UPLOADS_FILE, "a", encoding="utf-8") as f:
+                f.write(audio_filename + "\n")
+        except OSError as e:
+            self.logger.warning(f"Failed to record upload of '{audio_filename}' in '{MEDIA_UPLOADS_FILE}': {e}")
+
+    def _store_in_anki(self, audio_filename: str, audio_path: Optional[Path], audio_data: Optional[bytes] = None) -> None:
+        """
+        Uploads an audio file to Anki: by path when Anki runs locally and the file is saved,
+        otherwise as base64 (read from audio_path if audio_data is not given).
+        """
+        if self.anki.is_local and audio_path is not None:
+            self.anki.store_media_file_from_path(audio_filename, str(audio_path))
+            return
+        if audio_data is not None:
+            self.anki.store_media_file(audio_filename, _b64encode(audio_data))
+            return
+        with open(audio_path, "rb") as f:
+            if not audio_path.stat().st_size:
+                # mmap cannot map an empty file
+                self.anki.store_media_file(audio_filename, "")
+                return
+            # Encode straight from the mapped file instead of reading it into a bytes copy first
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                data_base64 = _b64encode(mm)
+        self.anki.store_media_file(audio_filename, data_base64)
+
+    @staticmethod
+    def audio_filename(text: str, word: str, audio_type: str, formatted_word: Optional[str] = None) -> str:
+        """
+        Returns the audio filename for a text (e.g., 'word-type-hash.mp3'); identical names mean identical audio.
+        formatted_word, if given, is format_word_for_filename(word) computed once by the caller for all of a word's audio.
+        """
+        if formatted_word is None:
+            formatted_word = format_word_for_filename(word)
+        return f"{formatted_word}-{audio_type}-{get_stable_hash(text)}.mp3"
+
+    def create_audio_file(self, text: str, word: str, audio_type: str, audio_filename: Optional[str] = None) -> str:
         """
         Creates an MP3 audio file for the given text using OpenAI TTS (Synchronous).
         Caches locally and uploads to Anki if needed.
+        audio_filename can pass in a name the caller already got from audio_filename().
         Returns the filename (e.g., 'word-type-hash.mp3').
         """
         if not text:
             self.logger.warning(f"Attempted to create audio for empty text (word: {word}, type: {audio_type}). Skipping.")
             return ""
 
-        formatted_word = format_word_for_filename(word)
-        stable_hash = get_stable_hash(text)
-        audio_filename = f"{formatted_word}-{audio_type}-{stable_hash}.mp3"
+        if audio_filename is None:
+            audio_filename = self.audio_filename(text, word, audio_type)
         audio_path = self.audio_dir / audio_filename
 
         try:
-            # 1. Check local cache
+            # 1. Anki already has this exact audio (same word, type and text hash): no TTS or upload needed,
+            #    even if the local copy is gone (cleaned up, or another machine)
+            anki_files = self._get_anki_media_files() # Use cached version for speed
+            if audio_filename in anki_files:
+                if self.logger.isEnabledFor(logging.DEBUG): # Hot path: most audio of a mature deck ends here
+                    self.logger.debug(f"Audio file already in Anki media: {audio_filename}")
+                return audio_filename
+
+            # 2. Check local cache; the file is not in Anki yet
             if audio_path.exists():
-                self.logger.debug(f"Audio file found locally: {audio_filename}")
-                # 2. Check if it's in Anki (force refresh might be too slow here, use cache)
-                anki_files = self._get_anki_media_files() # Use cached version for speed
-                if audio_filename not in anki_files:
-                    self.logger.info(f"File '{audio_filename}' exists locally but not in Anki. Uploading...")
-                    try:
-                        with open(audio_path, "rb") as f:
-                            audio_data = f.read()
-                        audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-                        # Upload synchronously
-                        self.anki.store_media_file(audio_filename, audio_base64)
-                        # Refresh cache after successful upload
-                        self._get_anki_media_files(force_refresh=True)
-                    except Exception as e:
-                        self.logger.error(f"Failed to upload existing local file '{audio_filename}' to Anki: {e}", exc_info=True)
-                        # Proceed, returning filename as local file exists
+                self.logger.info(f"File '{audio_filename}' exists locally but not in Anki. Uploading...")
+                try:
+                    # Upload synchronously
+                    self._store_in_anki(audio_filename, audio_path)
+                    # Record the upload instead of re-fetching the whole media list
+                    self._mark_in_anki(audio_filename)
+                except Exception as e:
+                    self.logger.error(f"Failed to upload existing local file '{audio_filename}' to Anki: {e}", exc_info=True)
+                    # Proceed, returning filename as local file exists
                 return audio_filename
 
             # 3. File doesn't exist locally, generate TTS
             self.logger.info(f"Generating TTS audio for '{audio_filename}'...")
+            # The MP3 is streamed straight to disk under a temporary name, so it is never held in memory
+            # and an interrupted download cannot leave a truncated file that later looks like a cache hit.
+            partial_path = audio_path.with_name(audio_path.name + ".part")
+            saved_path: Optional[Path] = None
+            audio_data: Optional[bytes] = None
             try:
+                # Wait for room in the RPM/CPM budget; the OpenAI client itself still retries 429s with Retry-After
+                self.tts_limiter.acquire(len(text))
                 # Synchronous API call
-                response = self.openai.audio.speech.create(
+                with self.openai.audio.speech.with_streaming_response.create(
                     model="tts-1",
                     voice="alloy",
                     input=text,
                     response_format="mp3"
-                )
-                # Get binary content directly
-                audio_data = response.content
+                ) as response:
+                    # 4. Save locally
+                    try:
+                        audio_file = open(partial_path, "wb")
+                    except OSError as e:
+                        self.logger.error(f"Failed to save audio file locally '{audio_path}': {e}", exc_info=True)
+                        # Continue to upload to Anki if possible, from memory
+                        audio_data = response.read()
+                    else:
+                        with audio_file:
+                            for chunk in response.iter_bytes(chunk_size=AUDIO_CHUNK_SIZE):
+                                audio_file.write(chunk)
+                        os.replace(partial_path, audio_path)
+                        saved_path = audio_path
+                        self.logger.debug(f"Saved TTS audio locally: {audio_path}")
 
             except RateLimitError as e:
                  self.logger.error(f"OpenAI TTS rate limit hit for '{audio_filename}': {e}", exc_info=True)
@@ -91,23 +256,15 @@ class AudioService:
             except Exception as e:
                 self.logger.error(f"Unexpected error during TTS generation for '{audio_filename}': {e}", exc_info=True)
                 raise RuntimeError(f"Failed to generate TTS audio.") from e
-
-            # 4. Save locally
-            try:
-                with open(audio_path, "wb") as f:
-                    f.write(audio_data)
-                self.logger.debug(f"Saved TTS audio locally: {audio_path}")
-            except IOError as e:
-                 self.logger.error(f"Failed to save audio file locally '{audio_path}': {e}", exc_info=True)
-                 # Continue to upload to Anki if possible
+            finally:
+                partial_path.unlink(missing_ok=True) # Left over only if the download failed
 
             # 5. Upload to Anki
             try:
-                audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-                # Synchronous upload
-                self.anki.store_media_file(audio_filename, audio_base64)
-                 # Refresh cache after successful upload
-                self._get_anki_media_files(force_refresh=True)
+                # Synchronous upload, from the saved file if there is one (memory otherwise)
+                self._store_in_anki(audio_filename, saved_path, audio_data)
+                # Record the upload instead of re-fetching the whole media list
+                self._mark_in_anki(audio_filename)
             except Exception as e:
                  # Error already logged in anki_connect.py
                  raise RuntimeError(f"Failed to upload generated audio '{audio_filename}' to Anki.") from e
@@ -124,7 +281,9 @@ class AudioService:
         """Deletes local audio files not in Anki's media collection (Synchronous)."""
         self.logger.info("Starting cleanup of unused local audio files...")
         try:
-            local_files = {f.name for f in self.audio_dir.glob("*.mp3") if f.is_file()}
+            # scandir's DirEntry knows the file type from the directory listing, so no stat per file
+            with os.scandir(self.audio_dir) as entries:
+                local_files = {entry.name for entry in entries if entry.name.endswith(".mp3") and entry.is_file()}
             # Force refresh on cleanup
             anki_files = self._get_anki_media_files(force_refresh=True)
 
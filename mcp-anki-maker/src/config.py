@@ -24,10 +24,19 @@ OPENAI_API_BASE: str | None = os.environ.get("OPENAI_API_BASE") or None
 ANKI_CONNECT_URL: str = os.environ.get("ANKI_CONNECT_URL", "http://127.0.0.1:8765")
 ANKI_DECK_NAME: str = os.environ.get("ANKI_DECK_NAME", "Vocabulary")
 ANKI_MODEL_NAME: str = os.environ.get("ANKI_MODEL_NAME", "Basic")
+# Concurrent OpenAI TTS requests while adding a batch of words
+TTS_MAX_WORKERS: int = int(os.environ.get("TTS_MAX_WORKERS", "8"))
+# Proactive OpenAI TTS limits (requests / input characters per minute, 0 = unlimited); raise them for higher account tiers
+TTS_MAX_RPM: int = int(os.environ.get("TTS_MAX_RPM", "50"))
+TTS_MAX_CPM: int = int(os.environ.get("TTS_MAX_CPM", "0"))
+# Seconds the Anki media filename list (persisted in DATA_DIR) is reused without asking AnkiConnect again
+MEDIA_CACHE_TTL: int = int(os.environ.get("MEDIA_CACHE_TTL", "60"))
 
 # --- Data and Log Paths (Relative to PROJECT_ROOT) ---
 DATA_DIR = PROJECT_ROOT / "data"
 AUDIO_DIR = DATA_DIR / "audio"
+MEDIA_CACHE_FILE = DATA_DIR / "anki_media_cache.json"
+MEDIA_UPLOADS_FILE = DATA_DIR / "anki_media_uploads.txt" # Uploaded since MEDIA_CACHE_FILE was written, one name per line
 LOG_DIR = PROJECT_ROOT / "logs"
 
 # --- Logging ---
@@ -1,9 +1,13 @@
 # src/main.py
 import atexit
+import os
 import sys
+import threading
 import csv # Import csv module
-from typing import List, Dict, Any, Optional # Ensure Optional is imported
+import json
+from typing import Iterable, List, Dict, Any, Optional, Set, Tuple # Ensure Optional is imported
 import logging
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path # Import Path
 
 # Use Pydantic directly for input model definition
@@ -13,9 +17,10 @@ from openai import OpenAI # Use synchronous client
 
 from .config import (
     OPENAI_API_KEY, OPENAI_API_BASE, ANKI_DECK_NAME, ANKI_MODEL_NAME, logger,
-    DATA_DIR # Import DATA_DIR
+    DATA_DIR, # Import DATA_DIR
+    TTS_MAX_WORKERS, MEDIA_CACHE_TTL
 )
-from .utils import WordInput, validate_word_data # WordInput is already a Pydantic model
+from .utils import WordInput, format_word_for_filename, validate_word_data # WordInput is already a Pydantic model
 from .anki_connect import AnkiConnectClient
 from .audio_service import AudioService
 
@@ -28,6 +33,12 @@ openai_client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_API_BASE)
 anki_client = AnkiConnectClient()
 # Pass the sync openai client to AudioService
 audio_service = AudioService(openai_client, anki_client)
+# TTS requests are network-bound, so the audio of a whole batch is generated concurrently
+tts_pool = ThreadPoolExecutor(max_workers=TTS_MAX_WORKERS, thread_name_prefix="tts")
+# The CSV backup runs after the tool has answered; a single worker keeps backups from overlapping
+backup_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="backup")
+_backup_lock = threading.Lock()
+_queued_backup: Optional[Future] = None
 
 mcp = FastMCP(
     name="anki-mcp-py-sync", # Renamed slightly
@@ -50,15 +61,114 @@ ANKI_FIELD_MAP = {
 }
 # Automatically create CSV headers based on the map + tags
 CSV_HEADERS = list(ANKI_FIELD_MAP.values()) + ["tags"]
+# Note IDs held by the CSV backup, so later backups only fetch and append new notes
+CSV_BACKUP_IDS_FILE = DATA_DIR / "anki_vocabulary_backup.ids.json"
+# The first backup of each process is a full rewrite, which also picks up notes edited in Anki since
+_full_backup_done = False
+
+def _write_backup_rows(writer: csv.DictWriter, notes: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+    """Writes a CSV row for every backed-up note as it arrives; returns (processed, skipped) counts."""
+    processed_count = 0
+    skipped_count = 0
+    for note in notes:
+        note_id_log = note.get('noteId', 'N/A') # For logging
+        try:
+            row = {}
+            fields = note.get("fields", {})
+
+            # Check if the note uses the expected model (optional but good practice)
+            current_model_name = note.get("modelName")
+            if current_model_name != ANKI_MODEL_NAME:
+                logger.warning(f"Skipping note ID {note_id_log}: Model mismatch (Expected '{ANKI_MODEL_NAME}', Found '{current_model_name}').")
+                skipped_count += 1
+                continue
+
+            # Map Anki fields to CSV columns using ANKI_FIELD_MAP
+            for anki_field, csv_header in ANKI_FIELD_MAP.items():
+                # Check if the field actually exists in the note's data
+                if anki_field in fields:
+                    field_data = fields[anki_field]
+                    row[csv_header] = field_data.get("value", "") # Get value, default to empty string
+                else:
+                    # Field defined in map doesn't exist in this note's model instance
+                    logger.warning(f"Field '{anki_field}' not found in note ID {note_id_log} (Model: '{current_model_name}'). Setting empty value in CSV.")
+                    row[csv_header] = "" # Assign empty string if field is missing
+
+            # Handle tags - join list into a comma-separated string
+            tags = note.get("tags", [])
+            row["tags"] = ",".join(tag for tag in tags if tag) # Ensure tags are strings and filter empty ones
+
+            # Basic check: ensure the primary 'word' field is not empty
+            word_header = ANKI_FIELD_MAP.get("Word", "word") # Get the CSV header for 'Word'
+            if not row.get(word_header):
+                 logger.warning(f"Skipping note ID {note_id_log} due to missing or empty primary 'Word' field value.")
+                 skipped_count += 1
+                 continue
+
+            writer.writerow(row)
+            processed_count += 1
+        except Exception as e:
+            logger.error(f"Error processing note ID {note_id_log} for backup: {e}", exc_info=False) # Keep log concise
+            skipped_count += 1
+    return processed_count, skipped_count
+
+
+def _load_backup_ids() -> Optional[Set[int]]:
+    """Returns the note IDs the CSV backup holds (written with it), or None if unknown."""
+    try:
+        with open(CSV_BACKUP_IDS_FILE, 'r', encoding='utf-8') as f:
+            return set(json.load(f))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable backup ID file '{CSV_BACKUP_IDS_FILE}': {e}")
+        return None
+
+
+def _save_backup_ids(note_ids: Optional[List[int]]) -> None:
+    """Atomically records the note IDs the CSV backup holds; None drops the record so the next backup is a full one."""
+    try:
+        if note_ids is None:
+            CSV_BACKUP_IDS_FILE.unlink(missing_ok=True)
+            return
+        tmp_ids_file = CSV_BACKUP_IDS_FILE.with_suffix(".tmp")
+        with open(tmp_ids_file, 'w', encoding='utf-8') as f:
+            json.dump(sorted(note_ids), f)
+        os.replace(tmp_ids_file, CSV_BACKUP_IDS_FILE)
+    except OSError as e:
+        logger.error(f"Failed to update backup ID file '{CSV_BACKUP_IDS_FILE}': {e}", exc_info=True)
+
+
+def _append_to_backup(new_ids: List[int], note_ids: List[int]) -> None:
+    """Appends rows for notes added since the last backup (new_ids) and records note_ids as backed up."""
+    if not new_ids:
+        logger.info(f"No new notes since the last backup; {CSV_BACKUP_FILE} is up to date.")
+        return
+    logger.info(f"Appending {len(new_ids)} new notes to {CSV_BACKUP_FILE}...")
+    try:
+        with open(CSV_BACKUP_FILE, 'a', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=CSV_HEADERS, extrasaction='ignore') # Ignore extra fields not in headers
+            processed_count, skipped_count = _write_backup_rows(writer, anki_client.iter_notes_info(new_ids))
+    except Exception as e:
+        logger.error(f"Failed to append to backup CSV file: {e}", exc_info=True)
+        _save_backup_ids(None) # Some of the new rows may have been written; rebuild the CSV next time
+        return
+    _save_backup_ids(note_ids)
+    logger.info(f"Appended {processed_count} notes to {CSV_BACKUP_FILE}. Skipped {skipped_count} notes.")
+
 
 def backup_anki_deck_to_csv():
-    """Fetches all notes from the configured Anki deck and saves them to a CSV file."""
+    """
+    Saves the notes of the configured Anki deck to a CSV file.
+    Once a process has written a full backup, later calls only append notes added since (the CSV is rebuilt if notes were deleted).
+    """
+    global _full_backup_done
     logger.info(f"Starting Anki deck backup to {CSV_BACKUP_FILE}...")
     try:
-        # 1. Find all notes in the deck
+        # 1. Find all notes in the deck (their info is fetched in chunks while writing)
         # Use the deck name stored in the anki_client instance
         query = f'"deck:{ANKI_DECK_NAME}"'
-        logger.debug(f"Finding notes with query: {query}")
+        logger.debug(f"Fetching notes with query: {query}")
         note_ids = anki_client.find_notes(query)
 
         if not note_ids:
@@ -69,88 +179,56 @@ def backup_anki_deck_to_csv():
                     writer = csv.DictWriter(csvfile, fieldnames=CSV_HEADERS)
                     writer.writeheader()
                 logger.info(f"Created empty backup file with headers: {CSV_BACKUP_FILE}")
+                _save_backup_ids(note_ids)
+                _full_backup_done = True
             except IOError as e:
                 logger.error(f"Failed to write empty backup CSV file: {e}", exc_info=True)
             return
 
-        logger.info(f"Found {len(note_ids)} notes in deck '{ANKI_DECK_NAME}'. Fetching details...")
-
-        # 2. Get info for all notes (consider batching for very large decks)
-        notes_info = anki_client.get_notes_info(note_ids)
+        logger.info(f"Found {len(note_ids)} notes in deck '{ANKI_DECK_NAME}'.")
 
-        rows_to_write = []
-        processed_count = 0
-        skipped_count = 0
-
-        # 3. Process notes and format for CSV
-        for note in notes_info:
-            note_id_log = note.get('noteId', 'N/A') # For logging
-            try:
-                row = {}
-                fields = note.get("fields", {})
-
-                # Check if the note uses the expected model (optional but good practice)
-                current_model_name = note.get("modelName")
-                if current_model_name != ANKI_MODEL_NAME:
-                    logger.warning(f"Skipping note ID {note_id_log}: Model mismatch (Expected '{ANKI_MODEL_NAME}', Found '{current_model_name}').")
-                    skipped_count += 1
-                    continue
-
-                # Map Anki fields to CSV columns using ANKI_FIELD_MAP
-                for anki_field, csv_header in ANKI_FIELD_MAP.items():
-                    # Check if the field actually exists in the note's data
-                    if anki_field in fields:
-                        field_data = fields[anki_field]
-                        row[csv_header] = field_data.get("value", "") # Get value, default to empty string
-                    else:
-                        # Field defined in map doesn't exist in this note's model instance
-                        logger.warning(f"Field '{anki_field}' not found in note ID {note_id_log} (Model: '{current_model_name}'). Setting empty value in CSV.")
-                        row[csv_header] = "" # Assign empty string if field is missing
-
-                # Handle tags - join list into a comma-separated string
-                tags = note.get("tags", [])
-                row["tags"] = ",".join(tag for tag in tags if tag) # Ensure tags are strings and filter empty ones
-
-                # Basic check: ensure the primary 'word' field is not empty
-                word_header = ANKI_FIELD_MAP.get("Word", "word") # Get the CSV header for 'Word'
-                if not row.get(word_header):
-                     logger.warning(f"Skipping note ID {note_id_log} due to missing or empty primary 'Word' field value.")
-                     skipped_count += 1
-                     continue
-
-                rows_to_write.append(row)
-                processed_count += 1
-            except Exception as e:
-                logger.error(f"Error processing note ID {note_id_log} for backup: {e}", exc_info=False) # Keep log concise
-                skipped_count += 1
-
-        # 4. Write to CSV
-        if not rows_to_write:
-             logger.warning("No valid notes processed for backup after filtering.")
-             # Optionally write just the header if file doesn't exist or is empty
-             if not CSV_BACKUP_FILE.exists() or CSV_BACKUP_FILE.stat().st_size == 0:
-                 try:
-                     with open(CSV_BACKUP_FILE, 'w', newline='', encoding='utf-8') as csvfile:
-                         writer = csv.DictWriter(csvfile, fieldnames=CSV_HEADERS)
-                         writer.writeheader()
-                     logger.info(f"Wrote header only to empty backup file: {CSV_BACKUP_FILE}")
-                 except IOError as e:
-                     logger.error(f"Failed to write header to empty backup CSV file: {e}", exc_info=True)
-             return
+        # 2. Only new notes need rows if the CSV already holds every other note of the deck
+        prior_ids = _load_backup_ids() if _full_backup_done and CSV_BACKUP_FILE.exists() else None
+        if prior_ids is not None and prior_ids.issubset(note_ids):
+            _append_to_backup([note_id for note_id in note_ids if note_id not in prior_ids], note_ids)
+            return
 
-        logger.info(f"Writing {processed_count} processed notes to CSV...")
+        # Rows are written to a temporary file as they are built (no second copy of the deck in memory);
+        # it replaces the backup only once complete, so a failed run keeps the previous backup intact.
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_backup_file = CSV_BACKUP_FILE.with_suffix(".csv.tmp")
         try:
-            # Ensure directory exists (should be handled by config.py, but double-check)
-            DATA_DIR.mkdir(parents=True, exist_ok=True)
-            with open(CSV_BACKUP_FILE, 'w', newline='', encoding='utf-8') as csvfile:
+            with open(tmp_backup_file, 'w', newline='', encoding='utf-8') as csvfile:
                 writer = csv.DictWriter(csvfile, fieldnames=CSV_HEADERS, extrasaction='ignore') # Ignore extra fields not in headers
                 writer.writeheader()
-                writer.writerows(rows_to_write)
-            logger.info(f"Successfully backed up {processed_count} notes to {CSV_BACKUP_FILE}. Skipped {skipped_count} notes.")
+                # 3. Process notes and stream each row straight to the CSV
+                processed_count, skipped_count = _write_backup_rows(writer, anki_client.iter_notes_info(note_ids))
+            # 4. Keep the CSV
+            if processed_count:
+                os.replace(tmp_backup_file, CSV_BACKUP_FILE)
+                _save_backup_ids(note_ids)
+                _full_backup_done = True
+                logger.info(f"Successfully backed up {processed_count} notes to {CSV_BACKUP_FILE}. Skipped {skipped_count} notes.")
+                return
         except IOError as e:
             logger.error(f"Failed to write backup CSV file: {e}", exc_info=True)
+            return
         except Exception as e:
              logger.error(f"An unexpected error occurred during CSV writing: {e}", exc_info=True)
+             return
+        finally:
+            tmp_backup_file.unlink(missing_ok=True)
+
+        logger.warning("No valid notes processed for backup after filtering.")
+        # Optionally write just the header if file doesn't exist or is empty
+        if not CSV_BACKUP_FILE.exists() or CSV_BACKUP_FILE.stat().st_size == 0:
+            try:
+                with open(CSV_BACKUP_FILE, 'w', newline='', encoding='utf-8') as csvfile:
+                    writer = csv.DictWriter(csvfile, fieldnames=CSV_HEADERS)
+                    writer.writeheader()
+                logger.info(f"Wrote header only to empty backup file: {CSV_BACKUP_FILE}")
+            except IOError as e:
+                logger.error(f"Failed to write header to empty backup CSV file: {e}", exc_info=True)
 
     except ConnectionError as e:
         logger.error(f"Anki connection error during backup: {e}. Backup aborted.")
@@ -158,6 +236,101 @@ def backup_anki_deck_to_csv():
         logger.error(f"An unexpected error occurred during the backup process: {e}", exc_info=True)
 
 
+def schedule_backup() -> bool:
+    """
+    Queues backup_anki_deck_to_csv on backup_pool. Returns False (and queues nothing) if a backup is
+    already waiting to start: it reads the deck after this call anyway, so a second one would repeat it.
+    """
+    global _queued_backup
+    with _backup_lock:
+        if _queued_backup is not None and not _queued_backup.running() and not _queued_backup.done():
+            return False
+        _queued_backup = backup_pool.submit(backup_anki_deck_to_csv)
+        return True
+
+
+def _add_pending_notes(
+        pending_notes: List[Tuple[WordInput, Dict[str, Any]]],
+        results: Dict[str, List[Dict[str, Any]]]
+) -> bool:
+    """
+    Adds prepared notes to Anki with one canAddNotes and one addNotes request instead of one addNote per word.
+    Notes Anki refuses are sent through add_note individually, so the failure carries Anki's reason (e.g. duplicate).
+    A single note is added with one addNote request.
+    Records every word in results and returns True if at least one note was added.
+    """
+    notes = [note for _, note in pending_notes]
+    # Notes marked not addable go through add_note below, one request whose error carries Anki's reason
+    if len(notes) == 1:
+        # Single word (the common case): skip canAddNotes/addNotes, add_note alone is one request
+        addable = [False]
+        batch_ids = iter(())
+    else:
+        try:
+            addable = anki_client.can_add_notes(notes)
+        except Exception as e:
+            error_message = str(e)
+            logger.error(f"Failed to add {len(notes)} notes to Anki: {error_message}", exc_info=False)
+            results["failed"].extend({"word": word_data.word, "error": error_message} for word_data, _ in pending_notes)
+            return False
+
+        # canAddNotes checks each note against the collection only, so two notes with the same first field
+        # both pass; only the first goes into addNotes (which would fail as a whole), add_note reports the rest
+        batch_keys = set()
+        for index, (note, ok) in enumerate(zip(notes, addable)):
+            if ok:
+                key = (note["modelName"], next(iter(note["fields"].values()), "").strip())
+                if key in batch_keys:
+                    addable[index] = False
+                batch_keys.add(key)
+
+        try:
+            batch_ids = iter(anki_client.add_notes([note for note, ok in zip(notes, addable) if ok]))
+        except Exception as e:
+            # Recent AnkiConnect versions reject the whole request if any note fails: add each note on its own,
+            # so every word gets its own result
+            logger.warning(f"addNotes failed ({e}), adding {len(notes)} notes one by one.")
+            addable = [False] * len(notes)
+            batch_ids = iter(())
+
+    any_success = False
+    for (word_data, note), ok in zip(pending_notes, addable):
+        try:
+            if ok:
+                note_id = next(batch_ids)
+                if note_id is None:
+                    raise ValueError("AnkiConnect returned null for addNote, possibly due to duplicate handling or misconfiguration.")
+            else:
+                # Let Anki report why this note cannot be added (or add a single note directly)
+                note_id = anki_client.add_note(
+                    deck_name=note["deckName"],
+                    model_name=note["modelName"],
+                    fields=note["fields"],
+                    tags=note["tags"]
+                )
+
+            results["success"].append({"word": word_data.word, "note_id": note_id})
+            logger.info(f"Successfully added word '{word_data.word}' to Anki (Note ID: {note_id}).")
+            any_success = True
+        except ValueError as ve: # Catch specific errors like duplicates
+            error_message = str(ve)
+            logger.warning(f"Skipped adding word '{word_data.word}': {error_message}")
+            results["failed"].append({"word": word_data.word, "error": error_message})
+        except Exception as e:
+            error_message = str(e)
+            logger.error(f"Failed to add word '{word_data.word}': {error_message}", exc_info=False)
+            results["failed"].append({"word": word_data.word, "error": error_message})
+    return any_success
+
+
+def _audio_texts(word_data: WordInput) -> List[Tuple[str, str]]:
+    """Returns the (audio type, text) pairs a word needs audio for."""
+    texts = [("word", word_data.word), ("definition", word_data.definition)]
+    if word_data.example:
+        texts.append(("example", word_data.example))
+    return texts
+
+
 # --- Tool Input Model ---
 # Define the input structure using Pydantic, FastMCP uses this for validation
 class AddWordsInputModel(BaseModel):
@@ -172,7 +345,7 @@ def add_words_batch(data: AddWordsInputModel) -> str:
     Add words to vocabulary list and create Anki cards (supports both single and batch operations).
     For single word, pass an array with one item. Generates audio using OpenAI TTS.
     Requires Anki to be running with AnkiConnect. Runs synchronously.
-    Triggers a full Anki deck backup to CSV after completion.
+    Triggers a full Anki deck backup to CSV in the background after completion.
 
     IMPORTANT USAGE NOTE FOR CALLER (LLM): Do NOT add any tags to the words unless the end-user explicitly requests specific tags. If the user does not specify tags, the 'tags' field in the input data MUST be omitted or set to null. Do not infer or create tags automatically.
     """
@@ -183,40 +356,48 @@ def add_words_batch(data: AddWordsInputModel) -> str:
     logger.info(f"Received request to add {op_desc}")
 
     results: Dict[str, List[Dict[str, Any]]] = {"success": [], "failed": []}
+    pending_notes: List[Tuple[WordInput, Dict[str, Any]]] = [] # Prepared notes, added in one batch after the loop
     processed_count = 0
     any_success = False # Track if at least one word was added successfully
 
     try:
-        # Populate Anki media cache once before starting
-        # Consider if this refresh is needed here or just in audio_service
-        audio_service._get_anki_media_files(force_refresh=True)
+        # Populate Anki media cache once before starting, unless the (persisted) list is recent enough
+        audio_service._get_anki_media_files(max_age=MEDIA_CACHE_TTL)
+
+        # Validate everything up front and start the audio of all valid words at once.
+        # Jobs are keyed by filename, so texts that map to the same audio file (the same definition or example
+        # repeated for one word, e.g. for both "Run" and "run") make one TTS call and two threads never write the same file.
+        validations = [validate_word_data(word_data) for word_data in words_to_process]
+        audio_jobs: Dict[str, Future] = {}
+        word_audio_keys: List[List[Tuple[str, str]]] = [] # (audio type, job key) per word, empty for invalid words
+        for word_data, (is_valid, _) in zip(words_to_process, validations):
+            audio_keys: List[Tuple[str, str]] = []
+            word_audio_keys.append(audio_keys)
+            if not is_valid:
+                continue
+            formatted_word = format_word_for_filename(word_data.word) # Shared by the word's audio files
+            for audio_type, text in _audio_texts(word_data):
+                job_key = audio_service.audio_filename(text, word_data.word, audio_type, formatted_word)
+                audio_keys.append((audio_type, job_key))
+                if job_key not in audio_jobs:
+                    audio_jobs[job_key] = tts_pool.submit(
+                        audio_service.create_audio_file, text, word_data.word, audio_type, job_key
+                    )
 
-        for word_data in words_to_process:
+        for word_data, (is_valid, error_msg), audio_keys in zip(words_to_process, validations, word_audio_keys):
             processed_count += 1
             logger.info(f"Processing word {processed_count}/{word_count}: '{word_data.word}'")
             try:
                 # 1. Validate Input Data
-                is_valid, error_msg = validate_word_data(word_data)
                 if not is_valid:
                     # Ensure error_msg is a string
                     raise ValueError(str(error_msg) if error_msg else "Invalid word data.")
 
-                # 2. Generate Audio Files (Sequentially)
+                # 2. Collect Audio Files (generated concurrently above)
                 audio_results: Dict[str, str] = {}
                 try:
-                    # Word Audio
-                    audio_results["word"] = audio_service.create_audio_file(
-                        word_data.word, word_data.word, "word"
-                    )
-                    # Definition Audio
-                    audio_results["definition"] = audio_service.create_audio_file(
-                        word_data.definition, word_data.word, "definition"
-                    )
-                    # Example Audio (if applicable)
-                    if word_data.example:
-                        audio_results["example"] = audio_service.create_audio_file(
-                            word_data.example, word_data.word, "example"
-                        )
+                    for audio_type, job_key in audio_keys:
+                        audio_results[audio_type] = audio_jobs[job_key].result()
                 except Exception as audio_err:
                      # Log the specific audio error but raise a general failure for the word
                     logger.error(f"Audio generation failed for '{word_data.word}': {audio_err}", exc_info=False)
@@ -237,20 +418,16 @@ def add_words_batch(data: AddWordsInputModel) -> str:
                     # Add other fields required by your ANKI_MODEL_NAME here, default to "" if not in input
                     # e.g., "MyOtherField": ""
                 }
-                logger.debug(f"Prepared fields for Anki note: {fields}")
+                if logger.isEnabledFor(logging.DEBUG): # Skip formatting the fields dict per word unless debugging
+                    logger.debug(f"Prepared fields for Anki note: {fields}")
 
-                # 4. Add Note to Anki (Synchronous)
-                note_id = anki_client.add_note(
+                # 4. Queue the Note; all words are added to Anki together below
+                pending_notes.append((word_data, anki_client.build_note(
                     deck_name=ANKI_DECK_NAME,
                     model_name=ANKI_MODEL_NAME,
                     fields=fields,
                     tags=word_data.tags # Pass tags list directly
-                )
-
-                # 5. Record Success
-                results["success"].append({"word": word_data.word, "note_id": note_id})
-                logger.info(f"Successfully added word '{word_data.word}' to Anki (Note ID: {note_id}).")
-                any_success = True # Mark that at least one succeeded
+                )))
 
             except ValueError as ve: # Catch specific errors like duplicates
                  error_message = str(ve)
@@ -262,6 +439,10 @@ def add_words_batch(data: AddWordsInputModel) -> str:
                 logger.error(f"Failed to process word '{word_data.word}': {error_message}", exc_info=False)
                 results["failed"].append({"word": word_data.word, "error": error_message})
 
+        # 5. Add Notes to Anki and Record Results
+        if pending_notes and _add_pending_notes(pending_notes, results):
+            any_success = True # Mark that at least one succeeded
+
         # --- Format Response ---
         success_count = len(results["success"])
         failed_count = len(results["failed"])
@@ -274,25 +455,30 @@ def add_words_batch(data: AddWordsInputModel) -> str:
                 fail_reason = results["failed"][0]['error'] if results["failed"] else "Unknown error"
                 response_message = f"❌ Failed to add word \"{words_to_process[0].word}\": {fail_reason}"
         else:
-            response_message = f"Batch add complete:\n"
-            response_message += f"✅ Successfully added: {success_count} words\n"
+            # Collected as parts and joined once; += would copy the growing message for every failure
+            message_parts = [
+                "Batch add complete:\n",
+                f"✅ Successfully added: {success_count} words\n",
+            ]
             if failed_count > 0:
-                response_message += f"❌ Failed: {failed_count} words\n\n"
-                response_message += "Failure Details:\n"
-                for failure in results["failed"]:
-                    response_message += f"- {failure['word']}: {failure['error']}\n"
+                message_parts.append(f"❌ Failed: {failed_count} words\n\n")
+                message_parts.append("Failure Details:\n")
+                message_parts.extend(f"- {failure['word']}: {failure['error']}\n" for failure in results["failed"])
+            response_message = "".join(message_parts)
 
         logger.info(f"Add operation summary: Success={success_count}, Failed={failed_count}")
 
         # --- *** TRIGGER BACKUP AFTER PROCESSING *** ---
         # Trigger backup regardless of partial failures to capture the current state.
-        logger.info("Attempting post-add Anki deck backup...")
+        # It runs in the background (errors are logged there), so the response does not wait for a full deck dump.
+        logger.info("Scheduling post-add Anki deck backup...")
         try:
-            backup_anki_deck_to_csv()
-            response_message += "\n\n💾 Anki deck backup to CSV completed."
+            if not schedule_backup():
+                logger.info("A backup is already queued; it will include these changes.")
+            response_message += "\n\n💾 Anki deck backup to CSV started in the background."
         except Exception as backup_err:
             # Log backup error but don't let it crash the main response
-            logger.error(f"An error occurred during the post-add backup: {backup_err}", exc_info=True)
+            logger.error(f"An error occurred while scheduling the post-add backup: {backup_err}", exc_info=True)
             response_message += "\n\n⚠️ Note: An error occurred during the automatic CSV backup."
         # --- *** END BACKUP TRIGGER *** ---
 
@@ -311,6 +497,8 @@ def add_words_batch(data: AddWordsInputModel) -> str:
 # --- Graceful Shutdown Handling ---
 def perform_cleanup():
     logger.info("Performing cleanup before exit...")
+    # Let a running or queued backup finish before the process exits
+    backup_pool.shutdown(wait=True)
     try:
         # Optional: Add backup on exit? Might be slow.
         # logger.info("Performing final backup on exit...")
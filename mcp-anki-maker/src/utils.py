@@ -1,5 +1,6 @@
 import re
 import hashlib
+import functools
 import logging
 from typing import Optional, Tuple, List
 from pydantic import BaseModel, Field, field_validator
@@ -33,17 +34,22 @@ def validate_word_data(word_data: WordInput) -> Tuple[bool, Optional[str]]:
 
 
 # --- Helper Functions ---
+class _FilenameTable(dict):
+    """str.translate table: ASCII letters (lowercased) and digits are kept, every other character becomes '_'."""
+    def __missing__(self, codepoint: int) -> str:
+        return '_'
+
+_FILENAME_TABLE = _FilenameTable({ord(c): c.lower() for c in "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"})
+
 def format_word_for_filename(word: str) -> str:
     """Formats a word into a safe filename component."""
-    # Replace non-alphanumeric characters with underscore
-    s = re.sub(r'[^a-zA-Z0-9]', '_', word)
-    # Replace multiple underscores with single underscore
-    s = re.sub(r'_+', '_', s)
-    # Remove leading/trailing underscores
-    s = s.strip('_')
-    return s.lower() or "invalid_word" # Ensure not empty
+    # One translate pass replaces non-alphanumeric characters with underscores and lowercases the rest;
+    # joining the non-empty parts collapses underscore runs and drops leading/trailing ones
+    s = '_'.join(filter(None, word.translate(_FILENAME_TABLE).split('_')))
+    return s or "invalid_word" # Ensure not empty
 
+@functools.lru_cache(maxsize=4096)
 def get_stable_hash(text: str) -> str:
-    """Generates a stable MD5 hash (8 chars) for the given text."""
+    """Generates a stable MD5 hash (8 chars) for the given text (memoized: the same texts recur across retries and batches)."""
     return hashlib.md5(text.encode('utf-8')).hexdigest()[:8]
 
@@ -1,11 +1,65 @@
 from typing import Any
+import asyncio
 import os
-from pathlib import Path
 from mcp.server.fastmcp import FastMCP
 
 # Initialize FastMCP server
 mcp = FastMCP("notes-mcp")
 
+# Upper bound on files open at once while notes are read in parallel
+MAX_CONCURRENT_READS = 32
+
+# Output of the last load_notes call and the (notes_dir, vault signature) it was built for
+_notes_cache: dict[str, Any] = {"key": None, "output": None}
+
+def _iter_markdown_files(directory: str):
+    """
+    Yields the paths of all .md files below directory, in the order of Path.glob("**/*.md"):
+    a directory's files first, then its subdirectories (symlinked directories are not followed,
+    unreadable ones are skipped).
+    os.scandir's DirEntry knows each entry's type already, so there is no stat call per entry.
+    """
+    subdirectories = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif entry.name.endswith(".md") and entry.is_file():
+                    yield entry.path
+    except OSError:
+        # Unreadable directory (e.g. permission denied): skip it, as Path.glob does
+        return
+    for subdirectory in subdirectories:
+        yield from _iter_markdown_files(subdirectory)
+
+def _vault_signature(file_paths: list[str]) -> tuple | None:
+    """
+    Returns (path, mtime, size) for every note, so adding, removing, renaming or editing a note changes it.
+    Returns None if a note vanished while scanning.
+    """
+    signature = []
+    for file_path in file_paths:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        signature.append((file_path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+def _read_text(file_path: str) -> str:
+    """Returns the UTF-8 text of a note."""
+    with open(file_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+async def _read_note(file_path: str, semaphore: asyncio.Semaphore) -> str | Exception:
+    """Reads a note in a worker thread so the event loop stays free; returns the error instead of raising it."""
+    async with semaphore:
+        try:
+            return await asyncio.to_thread(_read_text, file_path)
+        except Exception as e:
+            return e
+
 @mcp.tool()
 async def load_notes() -> str:
     """
@@ -35,43 +89,62 @@ async def load_notes() -> str:
     if not os.path.isdir(notes_dir):
         return f"Error: Directory not found: {notes_dir}"
     
-    # Collect all markdown files and format as markdown content
-    markdown_output = "# Obsidian Notes Content\n\n"
-    markdown_output += f"Notes loaded from: `{notes_dir}`\n\n"
-    markdown_output += "---\n\n"
+    # Collect all markdown files and format as markdown content.
+    # Parts are joined once at the end; += would copy the whole output for every note.
+    parts: list[str] = [
+        "# Obsidian Notes Content\n\n",
+        f"Notes loaded from: `{notes_dir}`\n\n",
+        "---\n\n",
+    ]
     
     file_count = 0
-    root_path = Path(notes_dir)
+    # Every scanned path starts with this prefix, so relative paths are a slice (no PurePath per note)
+    root_prefix_len = len(os.path.join(notes_dir, ""))
     
     try:
-        for file_path in root_path.glob("**/*.md"):
-            if file_path.is_file():
-                try:
-                    # Read file content
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        content = f.read()
-                    
-                    # Get relative path from the notes directory
-                    relative_path = file_path.relative_to(root_path).as_posix()
-                    
-                    # Add file metadata and content to markdown
-                    markdown_output += f"## File: {file_path.stem}\n"
-                    markdown_output += f"**Path:** `{relative_path}`\n\n"
-                    markdown_output += "### Content\n\n"
-                    markdown_output += f"```markdown\n{content}\n```\n\n"
-                    markdown_output += "---\n\n"
-                    
-                    file_count += 1
-                except Exception as e:
-                    markdown_output += f"## Error Reading: {file_path.stem}\n"
-                    markdown_output += f"**Path:** `{file_path.relative_to(root_path).as_posix()}`\n"
-                    markdown_output += f"**Error:** {str(e)}\n\n"
-                    markdown_output += "---\n\n"
+        note_paths = list(_iter_markdown_files(notes_dir))
+        # Stat calls are far cheaper than reading every note again: reuse the last output if no note changed
+        cache_key = (notes_dir, _vault_signature(note_paths))
+        if cache_key[1] is not None and _notes_cache["key"] == cache_key:
+            return _notes_cache["output"]
+        # Read all notes concurrently; results keep the order of note_paths
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_READS)
+        contents = await asyncio.gather(*(_read_note(file_path, semaphore) for file_path in note_paths))
     except Exception as e:
         return f"Error scanning directory: {str(e)}"
     
-    markdown_output += f"# Summary\n\nTotal files processed: {file_count}\n"
+    for file_path, content in zip(note_paths, contents):
+        # Get relative path from the notes directory, and the name without ".md" (what Path.stem gives)
+        relative_path = file_path[root_prefix_len:].replace(os.sep, "/")
+        name = os.path.basename(file_path)
+        stem = name[:-3] if len(name) > 3 else name
+        if isinstance(content, Exception):
+            parts.extend((
+                f"## Error Reading: {stem}\n",
+                f"**Path:** `{relative_path}`\n",
+                f"**Error:** {str(content)}\n\n",
+                "---\n\n",
+            ))
+            continue
+        
+        # Add file metadata and content to markdown
+        parts.extend((
+            f"## File: {stem}\n",
+            f"**Path:** `{relative_path}`\n\n",
+            "### Content\n\n",
+            f"```markdown\n{content}\n```\n\n",
+            "---\n\n",
+        ))
+        
+        file_count += 1
+    
+    parts.append(f"# Summary\n\nTotal files processed: {file_count}\n")
     
+    markdown_output = "".join(parts)
+    # Read errors may go away without the note changing (e.g. fixed permissions), so only clean loads are cached
+    if cache_key[1] is not None and file_count == len(note_paths):
+        _notes_cache["key"] = cache_key
+        _notes_cache["output"] = markdown_output
     return markdown_output
 
 if __name__ == "__main__":